@@ -0,0 +1,155 @@
+'''
+Lazy enumeration of every model of a CNF clause set or formula.
+
+ModelEnumerator walks a depth-first search tree over the clauses, applying
+unit propagation at each node. A branch stops as soon as every clause is
+satisfied, and the assignment reached so far is yielded as a cube: the
+variables it leaves out are don't-cares, so one cube stands for
+2^(free variables) models. Different cubes disagree on some decision, so
+they never share a model, and a branch that conflicts is dropped at once.
+The work therefore grows with the number of cubes and conflicts met, not
+with 2^n.
+
+The search state is just the stack of pending decision sequences.
+checkpoint() returns it in a JSON-friendly form, and a new enumerator given
+that checkpoint continues where the old one stopped.
+'''
+
+import os
+import sys
+from itertools import islice, product
+from WFF import Parser, symbols, tokenize, variables
+from CNF import IMPLICATION_FREE, NNF, CNF, symbol_clauses
+from SAT import normalize, propagate
+
+
+class ModelEnumerator:
+    '''
+    precondition: clauses is an iterable of clauses of signed integers and
+                  variables, when given, names every variable to enumerate
+                  over (it may add variables the clauses do not mention)
+    postcondition: iterating yields disjoint cubes, dicts from variable to
+                   bool, that together cover every model exactly once
+    '''
+    def __init__(self, clauses, variables=None, resume=None, budget=None, name=None):
+        clauses = [list(clause) for clause in clauses]
+        if variables is None:
+            variables = {abs(literal) for clause in clauses for literal in clause}
+        self.clauses = normalize(clauses)
+        self.variables = sorted(variables)
+        self.budget = budget
+        self.name = name or (lambda var: var)
+        if resume is None:
+            self.stack = [()]
+        else:
+            number = {self.name(var): var for var in self.variables}
+            self.stack = [
+                tuple(number[key] if value else -number[key] for key, value in branch)
+                for branch in resume
+            ]
+        self.cubes_found = 0
+        self.nodes = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while self.stack:
+            decisions = self.stack.pop()
+            self.nodes += 1
+            if self.budget is not None:
+                self.budget.progress['cubes found'] = self.cubes_found
+                self.budget.step()
+            assignment = {abs(literal): literal > 0 for literal in decisions}
+            residual = propagate(self.clauses, assignment)
+            if residual is None:
+                continue
+            if not residual:
+                self.cubes_found += 1
+                return {self.name(var): value for var, value in sorted(assignment.items())}
+            # Branch on the shortest clause, so propagation bites early.
+            literal = min(residual, key=len)[0]
+            self.stack.append(decisions + (-literal,))
+            self.stack.append(decisions + (literal,))
+        raise StopIteration
+
+    def cubes(self, limit=None):
+        '''
+        Yields at most limit more cubes; the enumerator can be resumed
+        afterwards.
+        '''
+        return islice(self, limit)
+
+    def models(self, limit=None):
+        '''
+        Yields at most limit more full assignments over every variable,
+        expanding each cube's don't-cares.
+        '''
+        keys = [self.name(var) for var in self.variables]
+        return islice((model for cube in self for model in expand(cube, keys)), limit)
+
+    def checkpoint(self):
+        '''
+        Returns the pending branches as lists of [variable, bool] pairs, to
+        be passed back as resume=.
+        '''
+        return [[[self.name(abs(literal)), literal > 0] for literal in branch] for branch in self.stack]
+
+    @classmethod
+    def from_formula(cls, expression: str, resume=None, budget=None):
+        '''
+        Enumerates the models of an infix WFF over its variables; cubes are
+        keyed by variable name.
+        '''
+        tree = Parser(tokenize(expression), budget=budget).parse_formula()
+        cnf = CNF(NNF(Parser(tokenize(IMPLICATION_FREE(expression)), budget=budget).parse_formula(), budget), budget)
+        names = {symbols.intern(name) + 1 for name in variables(tree)}
+        return cls(symbol_clauses(cnf), names, resume, budget,
+                   name=lambda var: symbols.name(var - 1))
+
+
+def expand(cube, keys):
+    '''
+    Yields every full assignment over keys that extends cube.
+    '''
+    free = [key for key in keys if key not in cube]
+    for values in product((False, True), repeat=len(free)):
+        model = dict(cube)
+        model.update(zip(free, values))
+        yield model
+
+
+def count(cubes, num_vars):
+    '''
+    Returns the number of models the cubes stand for over num_vars variables.
+    '''
+    return sum(1 << (num_vars - len(cube)) for cube in cubes)
+
+
+def main():
+    '''
+    Prints the models of CNF_Input.txt as cubes, at most the number given on
+    the command line.
+    '''
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else None
+
+    try:
+        with open(os.path.join(current_dir, "CNF_Input.txt"), "r", encoding="utf-8") as f:
+            expression = f.readline().strip()
+            if not expression:
+                raise ValueError("Input file is empty.")
+        enumerator = ModelEnumerator.from_formula(expression)
+        cubes = list(enumerator.cubes(limit))
+        for cube in cubes:
+            print(' ∧ '.join(name if value else f"¬{name}" for name, value in cube.items()) or '⊤')
+        total = count(cubes, len(enumerator.variables))
+        stopped = " (limit reached)" if limit is not None and len(cubes) == limit and enumerator.stack else ""
+        print(f"{len(cubes)} cubes, {total} of {2 ** len(enumerator.variables)} models{stopped}")
+
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+'''
+Reduced ordered binary decision diagrams over WFF formulas.
+
+Nodes are integers. 0 and 1 are the terminals; every other node n tests the
+variable var[n] and continues to low[n] when it is false and to high[n] when
+it is true. The unique table guarantees one node per (var, low, high), so two
+formulas are equivalent exactly when their BDDs are the same integer.
+
+Operations go through ite(f, g, h), "if f then g else h", whose results are
+memoized in a direct-mapped computed table of fixed size: a new entry simply
+overwrites whatever shares its slot. A manager built with a budget charges
+it one step per computed-table miss and one node per node it creates.
+
+Variables are tested in the order given to the manager, and new variables go
+to the bottom. sift() improves the order in place by swapping adjacent levels.
+Each variable keeps the set of its nodes, so a swap only touches the two
+levels involved, and every node counts the edges pointing at it, so a node
+that a swap leaves without parents is freed at once and its id reused. Node
+ids keep their meaning across a swap, but sift(roots) first reclaims every
+node the roots do not reach: only the roots and their descendants stay valid.
+'''
+
+import os
+import sys
+from WFF import Node, Parser, tokenize
+from Budget import default_budget
+
+FALSE = 0
+TRUE = 1
+
+
+class BDD:
+    def __init__(self, order=(), cache_size=1 << 16, budget=None):
+        if cache_size & (cache_size - 1):
+            raise ValueError("cache_size must be a power of two")
+        # Terminals sit below every level; their var is never read.
+        self.var = [None, None]
+        self.low = [0, 1]
+        self.high = [0, 1]
+        self.refs = [0, 0]
+        self.free = []
+        self.unique = {}
+        self.nodes_of = {}
+        self.level_of = {}
+        self.var_at = []
+        self.cache = [None] * cache_size
+        self.cache_mask = cache_size - 1
+        self.hits = 0
+        self.misses = 0
+        self.budget = budget
+        for name in order:
+            self.declare(name)
+
+    # ------------------ Nodes ------------------
+
+    def declare(self, name):
+        '''
+        Adds name as the lowest variable unless it is already known.
+        '''
+        if name not in self.level_of:
+            self.level_of[name] = len(self.var_at)
+            self.var_at.append(name)
+            self.nodes_of[name] = set()
+
+    def level(self, node):
+        return len(self.var_at) if node <= TRUE else self.level_of[self.var[node]]
+
+    def mk(self, name, low, high):
+        '''
+        Returns the node testing name with the given children, sharing an
+        existing one when possible.
+        '''
+        if low == high:
+            return low
+        key = (name, low, high)
+        node = self.unique.get(key)
+        if node is None:
+            if self.budget is not None:
+                self.budget.allocate()
+            if self.free:
+                node = self.free.pop()
+                self.var[node], self.low[node], self.high[node] = name, low, high
+                self.refs[node] = 0
+            else:
+                node = len(self.var)
+                self.var.append(name)
+                self.low.append(low)
+                self.high.append(high)
+                self.refs.append(0)
+            self.refs[low] += 1
+            self.refs[high] += 1
+            self.unique[key] = node
+            self.nodes_of[name].add(node)
+        return node
+
+    def release(self, node):
+        '''
+        Drops one reference to node, freeing it and then its children when
+        nothing points at them any more.
+        '''
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node <= TRUE:
+                continue
+            self.refs[node] -= 1
+            if self.refs[node] == 0:
+                name, low, high = self.var[node], self.low[node], self.high[node]
+                del self.unique[(name, low, high)]
+                self.nodes_of[name].discard(node)
+                self.var[node] = None
+                self.free.append(node)
+                stack.append(low)
+                stack.append(high)
+
+    def variable(self, name):
+        self.declare(name)
+        return self.mk(name, FALSE, TRUE)
+
+    # ------------------ Operations ------------------
+
+    def ite(self, f, g, h):
+        '''
+        precondition: f, g and h are nodes of this manager
+        postcondition: returns the node of (f ∧ g) ∨ (¬f ∧ h)
+        '''
+        if f == TRUE:
+            return g
+        if f == FALSE:
+            return h
+        if g == h:
+            return g
+        if g == TRUE and h == FALSE:
+            return f
+        key = (f, g, h)
+        slot = hash(key) & self.cache_mask
+        entry = self.cache[slot]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        if self.budget is not None:
+            self.budget.step()
+
+        top = min(self.level(f), self.level(g), self.level(h))
+        name = self.var_at[top]
+        cofactors = []
+        for node in (f, g, h):
+            if node > TRUE and self.var[node] == name:
+                cofactors.append((self.low[node], self.high[node]))
+            else:
+                cofactors.append((node, node))
+        (f0, f1), (g0, g1), (h0, h1) = cofactors
+        result = self.mk(name, self.ite(f0, g0, h0), self.ite(f1, g1, h1))
+        self.cache[slot] = (key, result)
+        return result
+
+    def negation(self, f):
+        return self.ite(f, FALSE, TRUE)
+
+    def conjunction(self, f, g):
+        return self.ite(f, g, FALSE)
+
+    def disjunction(self, f, g):
+        return self.ite(f, TRUE, g)
+
+    def implication(self, f, g):
+        return self.ite(f, g, TRUE)
+
+    def from_formula(self, tree: Node):
+        '''
+        precondition: tree is a parsed WFF, possibly using ⊤ and ⊥
+        postcondition: returns the BDD of tree; unseen variables are declared
+                       in the order they are first met
+        '''
+        built = {}
+        stack = [(tree, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if id(node) in built:
+                continue
+            if not expanded:
+                stack.append((node, True))
+                for child in (node.right, node.left):
+                    if child is not None:
+                        stack.append((child, False))
+                continue
+            if node.value == '⊤':
+                result = TRUE
+            elif node.value == '⊥':
+                result = FALSE
+            elif node.left is None:
+                result = self.variable(node.value)
+            elif node.value == '¬':
+                result = self.negation(built[id(node.left)])
+            else:
+                left, right = built[id(node.left)], built[id(node.right)]
+                if node.value == '∧':
+                    result = self.conjunction(left, right)
+                elif node.value == '∨':
+                    result = self.disjunction(left, right)
+                elif node.value == '→':
+                    result = self.implication(left, right)
+                else:
+                    raise ValueError(f"Invalid token: {node.value}")
+            built[id(node)] = result
+        return built[id(tree)]
+
+    # ------------------ Queries ------------------
+
+    def is_tautology(self, f):
+        return f == TRUE
+
+    def is_satisfiable(self, f):
+        return f != FALSE
+
+    def equivalent(self, f, g):
+        return f == g
+
+    def count(self, f):
+        '''
+        Returns the number of models of f over all declared variables, in
+        time linear in the size of f.
+        '''
+        total = len(self.var_at)
+        counts = {FALSE: 0, TRUE: 1}
+        stack = [f]
+        while stack:
+            node = stack[-1]
+            if node in counts:
+                stack.pop()
+                continue
+            low, high = self.low[node], self.high[node]
+            pending = [child for child in (low, high) if child not in counts]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            here = self.level(node)
+            counts[node] = (counts[low] << (self.level(low) - here - 1)) + \
+                           (counts[high] << (self.level(high) - here - 1))
+        return counts[f] << self.level(f)
+
+    def model(self, f):
+        '''
+        Returns one satisfying assignment of the variables on a path of f as
+        a dict, or None when f is unsatisfiable.
+        '''
+        if f == FALSE:
+            return None
+        assignment = {}
+        while f > TRUE:
+            if self.high[f] != FALSE:
+                assignment[self.var[f]] = True
+                f = self.high[f]
+            else:
+                assignment[self.var[f]] = False
+                f = self.low[f]
+        return assignment
+
+    def size(self, roots):
+        '''
+        Returns the number of internal nodes reachable from roots.
+        '''
+        seen = set()
+        stack = [r for r in roots if r > TRUE]
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            for child in (self.low[node], self.high[node]):
+                if child > TRUE:
+                    stack.append(child)
+        return len(seen)
+
+    # ------------------ Reordering ------------------
+
+    def reclaim(self, roots):
+        '''
+        Frees every node that roots do not reach and pins the roots with one
+        extra reference each, so the reference counts see every live node.
+        Returns the number of live nodes.
+        '''
+        live = set()
+        stack = [r for r in roots if r > TRUE]
+        while stack:
+            node = stack.pop()
+            if node in live:
+                continue
+            live.add(node)
+            for child in (self.low[node], self.high[node]):
+                if child > TRUE:
+                    stack.append(child)
+        for node in range(2, len(self.var)):
+            if self.var[node] is None:
+                continue
+            if node in live:
+                self.refs[node] = 0
+            else:
+                name = self.var[node]
+                del self.unique[(name, self.low[node], self.high[node])]
+                self.nodes_of[name].discard(node)
+                self.var[node] = None
+                self.free.append(node)
+        for node in live:
+            self.refs[self.low[node]] += 1
+            self.refs[self.high[node]] += 1
+        for root in roots:
+            self.refs[root] += 1
+        # Cached results may name freed nodes whose ids will be reused.
+        self.cache = [None] * len(self.cache)
+        return len(live)
+
+    def swap(self, level):
+        '''
+        Exchanges the variables at level and level + 1 and returns the change
+        in the number of live nodes. Every live node keeps the function it
+        denotes: nodes of the upper variable whose children test the lower
+        one are rewritten in place, and nodes left without parents are freed.
+        Only the nodes of those two variables are visited.
+        '''
+        x, y = self.var_at[level], self.var_at[level + 1]
+        before = len(self.var) - len(self.free)
+        moved = [
+            node for node in self.nodes_of[x]
+            if self.var[self.low[node]] == y or self.var[self.high[node]] == y
+        ]
+        self.var_at[level], self.var_at[level + 1] = y, x
+        self.level_of[x], self.level_of[y] = level + 1, level
+
+        def cofactors(node):
+            if node > TRUE and self.var[node] == y:
+                return self.low[node], self.high[node]
+            return node, node
+
+        for node in moved:
+            old_low, old_high = self.low[node], self.high[node]
+            del self.unique[(x, old_low, old_high)]
+            self.nodes_of[x].discard(node)
+            f00, f01 = cofactors(old_low)
+            f10, f11 = cofactors(old_high)
+            low, high = self.mk(x, f00, f10), self.mk(x, f01, f11)
+            # mk counted the edges of any node it built, but not these two.
+            self.refs[low] += 1
+            self.refs[high] += 1
+            self.var[node], self.low[node], self.high[node] = y, low, high
+            self.unique[(y, low, high)] = node
+            self.nodes_of[y].add(node)
+            self.release(old_low)
+            self.release(old_high)
+        return len(self.var) - len(self.free) - before
+
+    def sift(self, roots, max_growth=1.2):
+        '''
+        Rudell's sifting: each variable in turn, largest level first, is
+        moved down and then up through the levels and left where the BDDs of
+        roots are smallest. A variable stops moving in one direction once
+        the BDDs grow past max_growth times the best size seen. Nodes that
+        roots do not reach are freed first. Returns the final size.
+        '''
+        size = best_size = self.reclaim(roots)
+        order = sorted(self.var_at, key=lambda name: len(self.nodes_of[name]), reverse=True)
+        for name in order:
+            position = self.level_of[name]
+            best_level = position
+            while position < len(self.var_at) - 1 and size <= max_growth * best_size:
+                size += self.swap(position)
+                position += 1
+                if size < best_size:
+                    best_size, best_level = size, position
+            while position > 0 and (position > best_level or size <= max_growth * best_size):
+                size += self.swap(position - 1)
+                position -= 1
+                if size < best_size:
+                    best_size, best_level = size, position
+            while position < best_level:
+                size += self.swap(position)
+                position += 1
+            while position > best_level:
+                size += self.swap(position - 1)
+                position -= 1
+        for root in roots:
+            self.refs[root] -= 1
+        return best_size
+
+def main():
+    '''
+    Checks the CNF of CNF_Input.txt against the original formula and reports
+    its truth-table facts.
+    '''
+    from CNF import CNF, NNF, IMPLICATION_FREE
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    input_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(current_dir, "CNF_Input.txt")
+
+    try:
+        with open(input_path, "r", encoding="utf-8") as f:
+            expression = f.readline().strip()
+            if not expression:
+                raise ValueError("Input file is empty.")
+
+        budget = default_budget()
+        tree = Parser(tokenize(expression), budget=budget).parse_formula()
+        cnf = CNF(NNF(Parser(tokenize(IMPLICATION_FREE(expression)), budget=budget).parse_formula(), budget), budget)
+
+        bdd = BDD(budget=budget)
+        f = bdd.from_formula(tree)
+        g = bdd.from_formula(cnf)
+        print("Equivalent to its CNF" if bdd.equivalent(f, g) else "Not equivalent to its CNF")
+        if bdd.is_tautology(f):
+            print("Tautology")
+        elif not bdd.is_satisfiable(f):
+            print("Unsatisfiable")
+        print(f"Models: {bdd.count(f)} of {2 ** len(bdd.var_at)}")
+
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+'''
+Cooperative limits on how much work one call may do.
+
+A Budget is handed to the parser, NNF/CNF conversion, the Horn solver, the
+SAT search, a BDD manager or the ND2 validator, which report to it at their
+loop and recursion boundaries:
+
+    step(n)        n units of work done; checked against max_steps, and
+                   against the deadline every CLOCK_INTERVAL steps
+    allocate(n)    n nodes or clauses built; checked against max_nodes
+    nest(depth)    current nesting depth of the input; checked against
+                   max_depth
+
+When a limit is passed the engine stops by raising BudgetExceeded, which
+carries the limit that was hit and the progress made so far. Every engine
+takes budget=None by default and then only pays one `is not None` test per
+boundary.
+'''
+
+import os
+import time
+
+
+class BudgetExceeded(Exception):
+    '''
+    reason is 'deadline', 'steps', 'nodes' or 'depth'; stats holds steps,
+    nodes, the deepest nesting seen, elapsed seconds and whatever progress
+    the engines recorded.
+    '''
+    def __init__(self, reason, stats):
+        self.reason = reason
+        self.stats = stats
+        super().__init__(reason, stats)
+
+    def __str__(self):
+        details = ', '.join(
+            f"{name} {value:.3f}" if isinstance(value, float) else f"{name} {value}"
+            for name, value in self.stats.items()
+        )
+        return f"Budget exceeded ({self.reason}): {details}"
+
+
+class Budget:
+    CLOCK_INTERVAL = 256
+
+    def __init__(self, seconds=None, max_steps=None, max_nodes=None, max_depth=None):
+        self.started = time.monotonic()
+        self.deadline = self.started + seconds if seconds is not None else None
+        self.max_steps = max_steps
+        self.max_nodes = max_nodes
+        self.max_depth = max_depth
+        self.steps = 0
+        self.nodes = 0
+        self.depth = 0
+        self.progress = {}
+        self._clock = self.CLOCK_INTERVAL
+
+    def step(self, count=1):
+        self.steps += count
+        if self.max_steps is not None and self.steps > self.max_steps:
+            self.exceed('steps')
+        self._clock -= count
+        if self._clock <= 0:
+            self._clock = self.CLOCK_INTERVAL
+            if self.deadline is not None and time.monotonic() > self.deadline:
+                self.exceed('deadline')
+
+    def allocate(self, count=1):
+        self.nodes += count
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            self.exceed('nodes')
+
+    def nest(self, depth):
+        if depth > self.depth:
+            self.depth = depth
+            if self.max_depth is not None and depth > self.max_depth:
+                self.exceed('depth')
+
+    def stats(self):
+        return {
+            'steps': self.steps,
+            'nodes': self.nodes,
+            'depth': self.depth,
+            'elapsed': time.monotonic() - self.started,
+            **self.progress,
+        }
+
+    def exceed(self, reason):
+        raise BudgetExceeded(reason, self.stats())
+
+
+def default_budget():
+    '''
+    Returns a Budget built from $LOGIC_BUDGET, such as
+    "seconds=2,steps=1000000,nodes=500000,depth=200", or None when it is
+    not set.
+    '''
+    spec = os.environ.get('LOGIC_BUDGET')
+    if not spec:
+        return None
+    limits = {'seconds': None, 'steps': None, 'nodes': None, 'depth': None}
+    for item in spec.split(','):
+        name, _, value = item.partition('=')
+        name = name.strip()
+        if name not in limits:
+            raise ValueError(f"Unknown budget limit: {name}")
+        limits[name] = float(value) if name == 'seconds' else int(float(value))
+    return Budget(limits['seconds'], limits['steps'], limits['nodes'], limits['depth'])
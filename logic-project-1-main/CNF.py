@@ -1,4 +1,6 @@
 from WFF import *
+from Budget import default_budget
+from Cache import default_cache, engine_version
 
 def convert_to_postfix(expression):
     '''
@@ -68,63 +70,113 @@ def IMPLICATION_FREE(phi):
     
     return stack[0] if stack else ''
 
-def DISTR(n1: Node, n2: Node):
+def rebuild(root, expand, budget=None):
+    '''
+    Runs a recursive rewrite of a parse tree with an explicit stack, so a
+    deeply nested formula cannot hit Python's recursion limit.
+    expand(item) returns either the finished result for item, or a tuple
+    (combine, left, right): left and right are expanded in turn and
+    combine(left result, right result) is the result for item. Every
+    expanded item is charged to budget as one step and one node, the same
+    as one call of the recursive version.
+    '''
+    results = []
+    stack = [(None, root)]
+    while stack:
+        combine, item = stack.pop()
+        if combine is not None:
+            right = results.pop()
+            results.append(combine(results.pop(), right))
+            continue
+        if budget is not None:
+            budget.step()
+            budget.allocate()
+        expanded = expand(item)
+        if isinstance(expanded, tuple):
+            combine, left, right = expanded
+            stack.append((combine, None))
+            stack.append((None, right))
+            stack.append((None, left))
+        else:
+            results.append(expanded)
+    return results[0]
+
+def conjoin(left, right):
+    return Node('∧', left, right)
+
+def disjoin(left, right):
+    return Node('∨', left, right)
+
+def DISTR(n1: Node, n2: Node, budget=None):
     '''
     precondition: n1 and n2 are in CNF
     postcondition: DISTR (n1, n2) computes a CNF for n1 ∨ n2
     '''
-    if n1.is_conjunction():
-        return Node('∧', DISTR(n1.left, n2), DISTR(n1.right, n2))
-    elif n2.is_conjunction():
-        return Node('∧', DISTR(n1, n2.left), DISTR(n1, n2.right))
-    else:
-        return Node('∨', n1, n2)
+    def expand(pair):
+        n1, n2 = pair
+        if n1.is_conjunction():
+            return conjoin, (n1.left, n2), (n1.right, n2)
+        elif n2.is_conjunction():
+            return conjoin, (n1, n2.left), (n1, n2.right)
+        else:
+            return disjoin(n1, n2)
 
-def NNF(phi: Node):
+    return rebuild((n1, n2), expand, budget)
+
+def NNF(phi: Node, budget=None):
     '''
     precondition: phi is implication free
     postcondition: NNF(phi) computes a NNF for phi
     '''
-    if phi.is_literal() and phi.value.islower():
-        return phi
-    elif phi.is_conjunction():
-        # return NNF for each argument in conjunction
-        return Node('∧', NNF(phi.left), NNF(phi.right))
-    elif phi.is_disjunction():
-        return Node('∨', NNF(phi.left), NNF(phi.right))
-    elif phi.is_negation():
-        if phi.left.is_literal():
-            if phi.left.value.islower():
-                # Negation of a literal
-                return Node('¬', phi.left)
-            else:
-                # Negation of a negation (double negation elimination)
-                return Node(phi.left.left.value)
-        elif phi.left.is_conjunction():
-            # De Morgan's Law: ¬(A ∧ B) = ¬A ∨ ¬B
-            return Node('∨', NNF(Node('¬', phi.left.left)), NNF(Node('¬', phi.left.right)))
-        elif phi.left.is_disjunction():
-            # De Morgan's Law: ¬(A ∨ B) = ¬A ∧ ¬B
-            return Node('∧', NNF(Node('¬', phi.left.left)), NNF(Node('¬', phi.left.right)))
-    else:
-        raise ValueError("Input must be a literal, conjunction, disjunction, or negation.")
-
-def CNF(phi: Node):
+    def expand(phi):
+        if phi.is_literal() and phi.value.islower():
+            return phi
+        elif phi.is_conjunction():
+            # return NNF for each argument in conjunction
+            return conjoin, phi.left, phi.right
+        elif phi.is_disjunction():
+            return disjoin, phi.left, phi.right
+        elif phi.is_negation():
+            if phi.left.is_literal():
+                if phi.left.value.islower():
+                    # Negation of a literal
+                    return Node('¬', phi.left)
+                else:
+                    # Negation of a negation (double negation elimination)
+                    return Node(phi.left.left.value)
+            elif phi.left.is_conjunction():
+                # De Morgan's Law: ¬(A ∧ B) = ¬A ∨ ¬B
+                return disjoin, Node('¬', phi.left.left), Node('¬', phi.left.right)
+            elif phi.left.is_disjunction():
+                # De Morgan's Law: ¬(A ∨ B) = ¬A ∧ ¬B
+                return conjoin, Node('¬', phi.left.left), Node('¬', phi.left.right)
+        else:
+            raise ValueError("Input must be a literal, conjunction, disjunction, or negation.")
+
+    return rebuild(phi, expand, budget)
+
+def CNF(phi: Node, budget=None):
     ''' 
     precondition: phi implication free and in NNF
     postcondition: CNF(phi) computes an equivalent CNF for phi
     '''
-    if phi.is_literal():
-        if phi.value.islower():
-            return Node(phi.value)
+    def distribute(left, right):
+        return DISTR(left, right, budget)
+
+    def expand(phi):
+        if phi.is_literal():
+            if phi.value.islower():
+                return Node(phi.value)
+            else:
+                return Node('¬', Node(phi.left.value))
+        elif phi.is_conjunction():
+            return conjoin, phi.left, phi.right
+        elif phi.is_disjunction():
+            return distribute, phi.left, phi.right
         else:
-            return Node('¬', Node(phi.left.value))
-    elif phi.is_conjunction():
-        return Node('∧', CNF(phi.left), CNF(phi.right))
-    elif phi.is_disjunction():
-        return DISTR(CNF(phi.left), CNF(phi.right))
-    else:
-        raise ValueError("Input must be a literal, conjunction, or disjunction.")
+            raise ValueError("Input must be a literal, conjunction, or disjunction.")
+
+    return rebuild(phi, expand, budget)
     
 def inorder(node: Node):
     '''
@@ -132,18 +184,64 @@ def inorder(node: Node):
     '''
     if node is None:
         return ''
-    if node.is_literal() and node.value.islower():
-        return node.value
-    elif node.is_conjunction():
-        return f"({inorder(node.left)} ∧ {inorder(node.right)})"
-    elif node.is_disjunction():
-        return f"({inorder(node.left)} ∨ {inorder(node.right)})"
-    elif node.is_implication():
-        return f"({inorder(node.left)} → {inorder(node.right)})"
-    elif node.is_double_negation():
-        return f"¬¬{inorder(node.left.left)}"
-    elif node.is_negation():
-        return f"¬{inorder(node.left)}"
+    parts = []
+    # Strings are written out as they are popped, nodes are expanded.
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            parts.append(node)
+        elif node.is_literal() and node.value.islower():
+            parts.append(node.value)
+        elif node.is_conjunction():
+            stack.extend((')', node.right, ' ∧ ', node.left, '('))
+        elif node.is_disjunction():
+            stack.extend((')', node.right, ' ∨ ', node.left, '('))
+        elif node.is_implication():
+            stack.extend((')', node.right, ' → ', node.left, '('))
+        elif node.is_double_negation():
+            stack.extend((node.left.left, '¬¬'))
+        elif node.is_negation():
+            stack.extend((node.left, '¬'))
+    return ''.join(parts)
+
+def clauses(node: Node):
+    '''
+    precondition: node is in CNF, as returned by CNF
+    postcondition: yields each clause as a list of literals such as 'p' or
+                   '¬p', left to right, without building the infix string
+    '''
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.is_conjunction():
+            stack.append(node.right)
+            stack.append(node.left)
+            continue
+        clause = []
+        parts = [node]
+        while parts:
+            part = parts.pop()
+            if part.is_disjunction():
+                parts.append(part.right)
+                parts.append(part.left)
+            elif part.is_negation():
+                clause.append('¬' + part.left.value)
+            else:
+                clause.append(part.value)
+        yield clause
+
+def symbol_clauses(node: Node):
+    '''
+    Like clauses, with each literal as a signed integer: the symbol id of
+    its variable plus one, negative when the literal is negated.
+    '''
+    for clause in clauses(node):
+        yield [
+            -(symbols.intern(literal[1:]) + 1) if literal.startswith('¬')
+            else symbols.intern(literal) + 1
+            for literal in clause
+        ]
 
 def filtered(result: str):
     '''
@@ -156,10 +254,23 @@ def filtered(result: str):
         return items[0]
     # Join the items with ' ∧ ' and return
     return ' ∧ '.join(
-        f"({item})" if len(item) > 2 else item
+        f"({item})" if ' ∨ ' in item else item
         for item in items
     )
 
+def cnf_text(expression: str, budget=None):
+    '''
+    Returns the CNF of an infix WFF as main prints it.
+    '''
+    imp = IMPLICATION_FREE(expression)
+    tokens = tokenize(imp)
+    parser = Parser(tokens, budget=budget)
+    tree = parser.parse_formula()
+
+    result = CNF(NNF(tree, budget), budget)
+
+    return filtered(inorder(result))
+
 def main():
     current_dir = os.path.dirname(os.path.abspath(__file__))
     input_path = os.path.join(current_dir, "CNF_Input.txt")
@@ -170,14 +281,17 @@ def main():
             if not expression:
                 raise ValueError("Input file is empty.")
 
-            imp = IMPLICATION_FREE(expression)
-            tokens = tokenize(imp)
-            parser = Parser(tokens)
-            tree = parser.parse_formula()
-        
-            result = CNF(NNF(tree))
-
-            print(filtered(inorder(result)))
+            tokens = tokenize(expression)
+            # Input that does not tokenize skips the cache, so cnf_text
+            # reports it the same way whether LOGIC_CACHE is set or not.
+            cache = default_cache() if tokens is not None else None
+            budget = default_budget()
+            if cache is None:
+                print(cnf_text(expression, budget))
+            else:
+                with cache:
+                    print(cache.lookup('CNF', engine_version('CNF', 'WFF'), ' '.join(tokens),
+                                       lambda: cnf_text(expression, budget)))
     
     except Exception as e:
         print(f"Error: {e}")
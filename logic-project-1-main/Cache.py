@@ -0,0 +1,216 @@
+'''
+Persistent, content-addressed cache of engine results.
+
+A result is filed under sha256(engine, engine version, normalized input).
+The engine version is a hash of the source files the engine is built from,
+so editing any of them makes its old entries unreachable; they are never
+served again and age out through LRU eviction.
+
+Entries live in one SQLite table. The database runs in WAL mode, so any
+number of processes can read while one writes, and a lookup that hits
+normally writes nothing at all:
+
+    recency     each entry records when it was last used, refreshed at most
+                once per touch_interval seconds; once the cache holds more
+                than max_entries the least recently used ones are dropped
+    expiry      entries older than their TTL are treated as misses and left
+                for purge() to delete
+    statistics  hit and miss counts are kept in memory and added to the
+                database in one write by close()
+
+ND2.run_validator, Horn.main and CNF.main use the cache named by the
+LOGIC_CACHE environment variable when it is set.
+'''
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+
+_versions = {}
+
+
+def engine_version(*module_names):
+    '''
+    Returns a hash of the source of the given modules of this directory,
+    computed once per process. Files are read by name, so the version is the
+    same whether a module was imported or run as __main__.
+    '''
+    if module_names not in _versions:
+        digest = hashlib.sha256()
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        for name in module_names:
+            with open(os.path.join(current_dir, f"{name}.py"), 'rb') as f:
+                digest.update(f.read())
+        _versions[module_names] = digest.hexdigest()[:16]
+    return _versions[module_names]
+
+
+def cache_key(engine, version, normalized):
+    return hashlib.sha256(f"{engine}\0{version}\0{normalized}".encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    '''
+    precondition: path names a writable file (created when missing), or is
+                  ':memory:'
+    postcondition: get/put map keys to JSON-serializable values, with at
+                   most max_entries kept and entries expiring after ttl
+                   seconds (None for never)
+    '''
+    def __init__(self, path, max_entries=100000, ttl=None, touch_interval=60):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.touch_interval = touch_interval
+        self.hits = 0
+        self.misses = 0
+        self.flushed_hits = 0
+        self.flushed_misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, engine TEXT, value TEXT, "
+            "expires REAL, accessed REAL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, count INTEGER)"
+        )
+
+    def get(self, key):
+        '''
+        Returns the stored value, or None on a miss. Only refreshing a stale
+        access time writes to the database.
+        '''
+        now = time.time()
+        row = self.connection.execute(
+            "SELECT value, expires, accessed FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is not None and row[1] is not None and row[1] < now:
+            self.expired += 1
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if now - row[2] > self.touch_interval:
+            self.connection.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key, value, engine='', ttl=None):
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        expires = now + ttl if ttl is not None else None
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            self.connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                (key, engine, json.dumps(value), expires, now),
+            )
+            excess = self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self.connection.execute(
+                    "DELETE FROM results WHERE key IN "
+                    "(SELECT key FROM results ORDER BY accessed LIMIT ?)",
+                    (excess,),
+                )
+                self.evicted += excess
+
+    def lookup(self, engine, version, normalized, compute, ttl=None):
+        '''
+        Returns the cached result of compute() for this input, computing and
+        storing it on a miss.
+        '''
+        key = cache_key(engine, version, normalized)
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value, engine, ttl)
+        return value
+
+    def purge(self):
+        '''
+        Drops every expired entry and returns how many there were.
+        '''
+        with self.connection:
+            cursor = self.connection.execute(
+                "DELETE FROM results WHERE expires IS NOT NULL AND expires < ?", (time.time(),)
+            )
+        self.expired += cursor.rowcount
+        return cursor.rowcount
+
+    def flush(self):
+        '''
+        Adds the hits and misses counted since the last flush to the totals
+        kept in the database.
+        '''
+        pending = [('hits', self.hits - self.flushed_hits), ('misses', self.misses - self.flushed_misses)]
+        pending = [(name, count) for name, count in pending if count]
+        if not pending:
+            return
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO stats VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET count = count + excluded.count",
+                pending,
+            )
+        self.flushed_hits, self.flushed_misses = self.hits, self.misses
+
+    def stats(self):
+        '''
+        Returns the hit and miss counts of every process that used this
+        file, this one's unflushed counts included, plus the current number
+        of entries.
+        '''
+        totals = dict(self.connection.execute("SELECT name, count FROM stats"))
+        entries = self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return {
+            'hits': totals.get('hits', 0) + self.hits - self.flushed_hits,
+            'misses': totals.get('misses', 0) + self.misses - self.flushed_misses,
+            'entries': entries,
+        }
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def default_cache():
+    '''
+    Returns the cache at $LOGIC_CACHE, or None when it is not set.
+    '''
+    path = os.environ.get('LOGIC_CACHE')
+    return ResultCache(path) if path else None
+
+
+def main():
+    '''
+    Prints the statistics of the cache at $LOGIC_CACHE or the given path.
+    '''
+    path = sys.argv[1] if len(sys.argv) > 1 else os.environ.get('LOGIC_CACHE')
+    try:
+        if not path:
+            raise ValueError("No cache path given and LOGIC_CACHE is not set.")
+        with ResultCache(path) as cache:
+            cache.purge()
+            for name, count in cache.stats().items():
+                print(f"{name}: {count}")
+
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
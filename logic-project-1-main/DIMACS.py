@@ -0,0 +1,240 @@
+'''
+DIMACS CNF input and output.
+
+A clause set is kept the way DIMACS writes it: one flat array('i') of
+literals in which every clause ends with a 0. Reading memory-maps the file
+and converts it a block at a time, so no Python object is made per clause
+and memory stays at the size of the literal array plus one block.
+
+DimacsWriter streams clauses out as they are produced and patches the
+problem line once the final counts are known.
+'''
+
+import mmap
+import os
+import sys
+import tempfile
+from array import array
+from WFF import Parser, symbols, tokenize
+from CNF import IMPLICATION_FREE, NNF, CNF, symbol_clauses
+
+BLOCK_SIZE = 1 << 24
+HEADER_WIDTH = 48
+
+
+class DimacsCNF:
+    def __init__(self, num_vars, literals: array):
+        self.num_vars = num_vars
+        self.literals = literals
+        self.num_clauses = literals.count(0)
+
+    def clauses(self):
+        '''
+        Yields each clause as a memoryview over the literal array, without
+        its terminating 0.
+        '''
+        view = memoryview(self.literals)
+        literals = self.literals
+        start = 0
+        for _ in range(self.num_clauses):
+            end = literals.index(0, start)
+            yield view[start:end]
+            start = end + 1
+
+
+def _block_literals(block: bytes, literals: array):
+    '''
+    Appends the literals of a block that holds whole lines. Returns False
+    once the SATLIB end marker '%' has been reached.
+    '''
+    if b'c' not in block and b'%' not in block:
+        literals.extend(map(int, block.split()))
+        return True
+    for line in block.splitlines():
+        line = line.strip()
+        if line.startswith(b'%'):
+            return False
+        if line and not line.startswith(b'c'):
+            literals.extend(map(int, line.split()))
+    return True
+
+
+def read_dimacs(path):
+    '''
+    precondition: path is a DIMACS CNF file
+    postcondition: returns a DimacsCNF whose literal array holds every clause
+    '''
+    literals = array('i')
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError("Missing problem line")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            size = len(data)
+            pos = 0
+            num_vars = None
+            while pos < size:
+                end = data.find(b'\n', pos)
+                if end < 0:
+                    end = size
+                line = data[pos:end].strip()
+                pos = end + 1
+                if not line or line.startswith(b'c'):
+                    continue
+                fields = line.split()
+                if fields[0] != b'p' or len(fields) != 4 or fields[1] != b'cnf':
+                    raise ValueError("Missing problem line")
+                num_vars = int(fields[2])
+                break
+            if num_vars is None:
+                raise ValueError("Missing problem line")
+
+            while pos < size:
+                end = min(pos + BLOCK_SIZE, size)
+                if end < size:
+                    # Cut after a newline, so no number is split in two.
+                    cut = data.rfind(b'\n', pos, end)
+                    end = cut + 1 if cut >= pos else size
+                if not _block_literals(data[pos:end], literals):
+                    break
+                pos = end
+
+    if literals and literals[-1] != 0:
+        literals.append(0)
+    return DimacsCNF(num_vars, literals)
+
+
+class DimacsWriter:
+    '''
+    Writes clauses to path as they arrive. The problem line is reserved up
+    front with a fixed width and filled in by close().
+    '''
+    def __init__(self, path, buffer_size=1 << 20):
+        self.file = open(path, 'w', encoding='ascii', newline='\n')
+        self.file.write(' ' * (HEADER_WIDTH - 1) + '\n')
+        self.num_vars = 0
+        self.num_clauses = 0
+        self.pending = []
+        self.pending_size = 0
+        self.buffer_size = buffer_size
+
+    def _emit(self, text):
+        self.pending.append(text)
+        self.pending_size += len(text)
+        if self.pending_size >= self.buffer_size:
+            self.file.write(''.join(self.pending))
+            self.pending = []
+            self.pending_size = 0
+
+    def add_clause(self, literals):
+        '''
+        Writes one clause given as non-zero integers.
+        '''
+        for literal in literals:
+            if abs(literal) > self.num_vars:
+                self.num_vars = abs(literal)
+        self.num_clauses += 1
+        self._emit(' '.join(map(str, literals)) + ' 0\n' if literals else '0\n')
+
+    def add_literals(self, literals: array):
+        '''
+        Writes a whole 0-terminated literal array, as held by DimacsCNF, one
+        block at a time.
+        '''
+        if not literals:
+            return
+        if literals[-1] != 0:
+            raise ValueError("Literal array must end with 0")
+        self.num_vars = max(self.num_vars, max(literals), -min(literals))
+        self.num_clauses += literals.count(0)
+        step = max(1, self.buffer_size // 8)
+        start = 0
+        while start < len(literals):
+            end = min(start + step, len(literals))
+            end = literals.index(0, end - 1) + 1
+            block = literals[start:end]
+            text = ' '.join(map(str, block))
+            if text.startswith('0') or ' 0 0' in text:
+                # Empty clauses would defeat the bulk line splitting below.
+                text = ''.join(
+                    ' '.join(map(str, clause)) + ' 0\n' if clause else '0\n'
+                    for clause in DimacsCNF(0, block).clauses()
+                )
+            else:
+                text = text.replace(' 0 ', ' 0\n') + '\n'
+            self._emit(text)
+            start = end
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.file.write(''.join(self.pending))
+        self.pending = []
+        header = f"p cnf {self.num_vars} {self.num_clauses}"
+        if len(header) >= HEADER_WIDTH:
+            raise ValueError("Problem line does not fit the reserved header")
+        self.file.seek(0)
+        self.file.write(header.ljust(HEADER_WIDTH - 1))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_dimacs(instance: DimacsCNF, path):
+    with DimacsWriter(path) as writer:
+        writer.add_literals(instance.literals)
+        writer.num_vars = max(writer.num_vars, instance.num_vars)
+
+
+def write_formula(expression: str, path):
+    '''
+    Streams the CNF of an infix WFF to path as DIMACS. Variables are
+    numbered 1..n in order of first appearance in the clauses, whatever
+    WFF.symbols has seen before; returns that numbering by name.
+    '''
+    imp = IMPLICATION_FREE(expression)
+    tree = CNF(NNF(Parser(tokenize(imp)).parse_formula()))
+    numbers = {}
+    with DimacsWriter(path) as writer:
+        for clause in symbol_clauses(tree):
+            local = []
+            for literal in clause:
+                number = numbers.setdefault(abs(literal), len(numbers) + 1)
+                local.append(number if literal > 0 else -number)
+            writer.add_clause(local)
+    return {symbols.name(sid - 1): number for sid, number in numbers.items()}
+
+
+def main():
+    '''
+    With a .cnf path, reads it and prints its size; otherwise prints the CNF
+    of CNF_Input.txt as DIMACS.
+    '''
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    try:
+        if len(sys.argv) > 1:
+            instance = read_dimacs(sys.argv[1])
+            print(f"p cnf {instance.num_vars} {instance.num_clauses}")
+            print(f"{len(instance.literals) - instance.num_clauses} literals")
+            return
+        with open(os.path.join(current_dir, "CNF_Input.txt"), "r", encoding="utf-8") as f:
+            expression = f.readline().strip()
+            if not expression:
+                raise ValueError("Input file is empty.")
+        with tempfile.TemporaryDirectory() as tmp:
+            output_path = os.path.join(tmp, "CNF_Input.cnf")
+            numbering = write_formula(expression, output_path)
+            for name, number in numbering.items():
+                print(f"c {number} = {name}")
+            with open(output_path, "r", encoding="ascii") as f:
+                print(f.read(), end='')
+
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
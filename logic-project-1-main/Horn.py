@@ -1,4 +1,6 @@
 from WFF import *
+from Budget import default_budget
+from Cache import default_cache, engine_version
 
 def is_kind_of_P(token: Node):
     '''
@@ -41,35 +43,100 @@ def is_horn_formula(formula):
             return False
     return True
 
-def is_satisfiable(formula):
+def is_satisfiable(formula, budget=None):
     '''
     Checks if the Horn formula is satisfiable.
+    Atoms are compared by symbol id, so names such as x1 and x12 never match
+    each other. With a budget, every clause looked at is one step.
     '''
-    marked = '⊤ '
+    top = symbols.intern('⊤')
+    bottom = symbols.intern('⊥')
+    marked = [top]
+    marked_ids = {top}
     clauses = formula.split(')∧(')
     remaining_clauses = dict()
     for clause in clauses:
         clause = clause.replace('(', '').replace(')', '')
         implication_parts = clause.split('→')
-        left_literals = implication_parts[0].strip().split('∧')
-        if tuple(left_literals) not in remaining_clauses.keys():
-            remaining_clauses[tuple(left_literals)] = implication_parts[1].strip()
-        else:
-            remaining_clauses[tuple(left_literals)] += ' ' + implication_parts[1].strip()
+        left_literals = tuple(symbols.intern(literal.strip()) for literal in implication_parts[0].strip().split('∧'))
+        head = symbols.intern(implication_parts[1].strip())
+        remaining_clauses.setdefault(left_literals, []).append(head)
+    if budget is not None:
+        budget.allocate(len(remaining_clauses))
     while True:
-        previous_marked = marked
+        changed = False
+        if budget is not None:
+            budget.progress['atoms marked'] = len(marked) - 1
+            budget.step(len(remaining_clauses))
         for clause in remaining_clauses:
-            if all(literal in marked for literal in clause):
-                if remaining_clauses[clause] not in marked:
-                    marked += remaining_clauses[clause] + ' '
+            if all(literal in marked_ids for literal in clause):
+                heads = [head for head in remaining_clauses[clause] if head not in marked_ids]
+                if heads:
+                    for head in heads:
+                        if head not in marked_ids:
+                            marked.append(head)
+                            marked_ids.add(head)
                     remaining_clauses.pop(clause)
+                    changed = True
                     break
-        if marked == previous_marked:
+        if not changed:
             break
-    if '⊥' in marked:
+    if bottom in marked_ids:
         return False, ''
     else:
-        return True, marked.replace('⊤', '').strip()
+        return True, ' '.join(symbols.name(sid) for sid in marked[1:])
+
+def horn_model(clauses, budget=None):
+    '''
+    precondition: clauses is a list of clauses of signed integer literals,
+                  none with more than one positive literal
+    postcondition: returns the set of variables true in the least model, or
+                   None if the clauses are unsatisfiable. Each literal is
+                   visited once, so this runs in linear time.
+    '''
+    if budget is not None:
+        budget.allocate(len(clauses))
+    waiting = []
+    heads = []
+    watchers = {}
+    queue = []
+    for index, clause in enumerate(clauses):
+        body = {-literal for literal in clause if literal < 0}
+        positive = [literal for literal in clause if literal > 0]
+        heads.append(positive[0] if positive else None)
+        waiting.append(len(body))
+        for var in body:
+            watchers.setdefault(var, []).append(index)
+        if not body:
+            if not positive:
+                return None
+            queue.append(positive[0])
+    true_vars = set()
+    while queue:
+        if budget is not None:
+            budget.step()
+        var = queue.pop()
+        if var in true_vars:
+            continue
+        true_vars.add(var)
+        for index in watchers.get(var, ()):
+            waiting[index] -= 1
+            if waiting[index] == 0:
+                if heads[index] is None:
+                    return None
+                queue.append(heads[index])
+    return true_vars
+
+def horn_report(expression, budget=None):
+    '''
+    Returns the lines main prints for a Horn formula without spaces.
+    '''
+    if not is_horn_formula(expression):
+        return ["Invalid Horn Formula"]
+    answer, trues = is_satisfiable(expression, budget)
+    if not answer:
+        return ["Unsatisfiable"]
+    return ["Satisfiable", trues] if trues else ["Satisfiable"]
 
 def main():
     current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -82,16 +149,16 @@ def main():
                 raise ValueError("Input file is empty.")
             
             expression = expression.replace('¬¬', '').replace(' ', '')
-            if not is_horn_formula(expression):
-                print("Invalid Horn Formula")
+            cache = default_cache()
+            budget = default_budget()
+            if cache is None:
+                report = horn_report(expression, budget)
             else:
-                answer, trues = is_satisfiable(expression)
-                if answer:
-                    print("Satisfiable")
-                    if trues:
-                        print(trues)
-                else:
-                    print("Unsatisfiable")
+                with cache:
+                    report = cache.lookup('Horn', engine_version('Horn', 'WFF'), expression,
+                                          lambda: horn_report(expression, budget))
+            for line in report:
+                print(line)
 
     except Exception as e:
         print(f"Error: {e}")
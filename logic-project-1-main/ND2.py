@@ -1,6 +1,8 @@
 import re
-from WFF import Node, Parser, tokenize
+from WFF import Node, Parser, symbols, tokenize
 from Natural_Deduction import *
+from Budget import BudgetExceeded, default_budget
+from Cache import default_cache, engine_version
 
 
 # ------------------ Proof Parsing ------------------
@@ -8,7 +10,7 @@ from Natural_Deduction import *
 class ProofLine:
     def __init__(self, number, formula, rule, references, scope_level, raw):
         self.number = number
-        self.formula = formula.strip() if formula else None
+        self.formula = formula.strip() if formula is not None else None
         self.rule = rule
         self.references = references or []
         self.scope_level = scope_level
@@ -51,117 +53,191 @@ def parse_proof_file(filename):
             proof.append(ProofLine(number, formula, rule, refs, scope_level, raw))
     return proof
 
-def rule_output(rule, refs, known, line):
-    if rule in ('Premise', 'Assumption'):
-        return None
-    if rule == 'Copy':
-        if len(refs) != 1 or refs[0] not in known:
+# ------------------ Parsed Formulas ------------------
+
+class Formula(Node):
+    '''
+    Immutable formula node. Formulas built by one FormulaTable are
+    hash-consed: structurally equal formulas are the same object, so rules
+    compare them with `is` in constant time.
+    '''
+    def __init__(self, value, left=None, right=None):
+        object.__setattr__(self, 'value', value)
+        object.__setattr__(self, 'left', left)
+        object.__setattr__(self, 'right', right)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Formula is immutable")
+
+
+class FormulaTable:
+    def __init__(self, budget=None):
+        self.nodes = {}
+        self.parsed = {}
+        self.budget = budget
+        self.bottom = self.node('⊥')
+
+    def node(self, value, left=None, right=None):
+        '''
+        Returns the unique formula with this connective and these (already
+        interned) children. Variables are keyed by their symbol id.
+        '''
+        key = symbols.intern(value) if left is None else (value, id(left), id(right))
+        formula = self.nodes.get(key)
+        if formula is None:
+            formula = self.nodes[key] = Formula(value, left, right)
+        return formula
+
+    def parse(self, text):
+        '''
+        Parses a line's formula once; lines repeating a text share the
+        result. Returns None when the text is not a WFF.
+        '''
+        if text in self.parsed:
+            return self.parsed[text]
+        formula = self.parsed[text] = self._parse(text)
+        return formula
+
+    def _parse(self, text):
+        tokens = tokenize(text, extra='⊤⊥') if text else None
+        if not tokens:
             return None
-        return known[refs[0]]
-    if rule == '⊥e':
-        if len(refs) != 1 or refs[0] not in known:
+        parser = Parser(tokens, extra='⊤⊥', node=self.node, budget=self.budget)
+        try:
+            formula = parser.parse_formula()
+        except ValueError:
             return None
-        return line.formula if known[refs[0]] == '⊥' else None
-    if rule == '→i':
-        if len(refs) != 1 or not isinstance(refs[0], tuple):
+        if parser.current() is not None:
             return None
-        start, end = refs[0]
-        if start not in known or end not in known or start >= end:
+        return formula
+
+
+def premise_rule_output(rule, premises, table: FormulaTable):
+    '''
+    The rules of Natural_Deduction.rule_functions, on parsed premises.
+    '''
+    if rule == '∧i':
+        if len(premises) != 2:
+            return None
+        return table.node('∧', premises[0], premises[1])
+    if rule in ('∧e1', '∧e2', '¬¬e', '¬¬i'):
+        if len(premises) != 1:
             return None
-        return ' → '.join(
-            f"({known[i]})" if len(known[i]) > 2 else known[i]
-            for i in [start, end]
-        )
-    if rule == '¬i':
-        if len(refs) != 1 or not isinstance(refs[0], tuple):
+        formula = premises[0]
+        if rule == '¬¬i':
+            return table.node('¬', table.node('¬', formula))
+        if rule == '¬¬e':
+            return formula.left.left if formula.is_double_negation() else None
+        if not formula.is_conjunction():
+            return None
+        return formula.left if rule == '∧e1' else formula.right
+    if len(premises) != 2:
+        return None
+    first, second = premises
+    if rule == '→e':
+        if first.is_implication() and first.left is second:
+            return first.right
+        return None
+    if rule == '¬e':
+        if second.is_negation() and second.left is first:
+            return table.bottom
+        return None
+    if rule == 'MT':
+        if first.is_implication() and second.is_negation() and second.left is first.right:
+            return table.node('¬', first.left)
+        return None
+    return None
+
+
+def rule_output(rule, refs, known, conclusion, table: FormulaTable):
+    '''
+    precondition: known maps line numbers to the Formula of that line (or
+                  None if it did not parse); conclusion is the Formula of
+                  the line being checked
+    postcondition: returns the Formula the rule derives from refs, or None
+                   if the rule cannot be applied
+    '''
+    if rule in ('Premise', 'Assumption'):
+        return None
+
+    def box(ref):
+        if not isinstance(ref, tuple):
             return None
-        start, end = refs[0]
-        if start not in known or end not in known or start >= end:
+        start, end = ref
+        if known.get(start) is None or known.get(end) is None or start >= end:
             return None
-        if known[end] != '⊥':
+        return known[start], known[end]
+
+    def line(ref):
+        return known.get(ref) if isinstance(ref, int) else None
+
+    if rule == 'Copy':
+        if len(refs) != 1:
             return None
-        return f"¬({known[start]})" if len(known[start]) > 2 else f"¬{known[start]}"
-    if rule == 'PBC':
-        if len(refs) != 1 or not isinstance(refs[0], tuple):
+        return line(refs[0])
+    if rule == '⊥e':
+        if len(refs) != 1 or line(refs[0]) is None:
             return None
-        start, end = refs[0]
-        if start not in known or end not in known or start >= end:
+        return conclusion if line(refs[0]) is table.bottom else None
+    if rule in ('→i', '¬i', 'PBC'):
+        if len(refs) != 1 or box(refs[0]) is None:
             return None
-        if known[end] != '⊥':
+        assumption, last = box(refs[0])
+        if rule == '→i':
+            return table.node('→', assumption, last)
+        if last is not table.bottom:
             return None
-        return filter(known[start][1:])
+        if rule == '¬i':
+            return table.node('¬', assumption)
+        return assumption.left if assumption.is_negation() else None
     if rule == 'LEM':
         if len(refs) != 0:
             return None
-        formula = line.formula
-        tokens = tokenize(formula, extra='⊤⊥')
-        parser = Parser(tokens, extra='⊤⊥')
-        tree = parser.parse_formula()
-        if not tree.is_disjunction():
+        return conclusion if conclusion.is_disjunction() else None
+    if rule in ('∨i1', '∨i2'):
+        if len(refs) != 1 or line(refs[0]) is None:
             return None
-        return filter(inorder(tree))
-    if rule == '∨i1':
-            if len(refs) != 1 or refs[0] not in known:
-                return None
-            formula = line.formula
-            tokens= tokenize(formula, extra='⊤⊥')
-            parser = Parser(tokens, extra='⊤⊥')
-            tree = parser.parse_formula()
-            if not tree.is_disjunction():
-                return None
-            left = filter(inorder(tree.left))
-            if left != filter(known[refs[0]]):
-                return None
-            return formula
-    if rule == '∨i2':
-        if len(refs) != 1 or refs[0] not in known:
+        if not conclusion.is_disjunction():
             return None
-        formula = line.formula
-        tokens= tokenize(formula, extra='⊤⊥')
-        parser = Parser(tokens, extra='⊤⊥')
-        tree = parser.parse_formula()
-        if not tree.is_disjunction():
-            return None
-        right = filter(inorder(tree.right))
-        if right != filter(known[refs[0]]):
-            return None
-        return formula
+        side = conclusion.left if rule == '∨i1' else conclusion.right
+        return conclusion if side is line(refs[0]) else None
     if rule == '∨e':
         if len(refs) != 3:
             return None
-        first_references = refs[0]
-        formula = known.get(first_references, None)
-        tokens = tokenize(formula, extra='⊤⊥')
-        parser = Parser(tokens, extra='⊤⊥')
-        tree = parser.parse_formula()
-        if not tree.is_disjunction():
+        disjunction = line(refs[0])
+        first, second = box(refs[1]), box(refs[2])
+        if disjunction is None or first is None or second is None:
             return None
-        left = filter(inorder(tree.left))
-        right = filter(inorder(tree.right))
-        if left != known[refs[1][0]] or right != known[refs[2][0]]:
+        if not disjunction.is_disjunction():
             return None
-        conc = line.formula
-        if conc != known[refs[1][1]] or conc != known[refs[2][1]]:
+        if first[0] is not disjunction.left or second[0] is not disjunction.right:
             return None
-        return conc
-        
-        
+        if first[1] is not conclusion or second[1] is not conclusion:
+            return None
+        return conclusion
 
-    func = rule_functions.get(rule)
-    if func:
+    if rule in rule_functions:
         # Check all references exist
-        flat_refs = []
-        for r in refs:
-            if isinstance(r, int):
-                flat_refs.append(r)
-            elif isinstance(r, tuple):
-                flat_refs.extend(range(r[0], r[1]+1))
-        if any(r not in known for r in flat_refs):
+        premises = [known.get(r) for r in expanded_refs(refs)]
+        if any(p is None for p in premises):
             return None
-        return func(known, flat_refs)
+        return premise_rule_output(rule, premises, table)
 
     return None
 
+def expanded_refs(refs):
+    '''
+    The referenced line numbers in the order they are cited, with ranges
+    expanded in place.
+    '''
+    flat_refs = []
+    for r in refs:
+        if isinstance(r, int):
+            flat_refs.append(r)
+        elif isinstance(r, tuple):
+            flat_refs.extend(range(r[0], r[1]+1))
+    return flat_refs
+
 # ------------------ Proof Validator ------------------
 def check_scopes(proof_lines):
     scope_stack = []
@@ -248,68 +324,206 @@ def check_scopes(proof_lines):
 
     return None
 
-def validate_proof(proof_lines):
+def flatten_refs(refs):
+    result = set()
+    for r in refs:
+        if isinstance(r, tuple):
+            result.update(range(r[0], r[1] + 1))
+        else:
+            result.add(r)
+    return result
+
+def first_invalid_line(proof_lines, invalid_lines, line_dependencies):
+    '''
+    Reports the first line, in proof order, that is invalid or rests on an
+    invalid line, in one forward pass. A line citing an earlier invalid line
+    comes after it, so the earlier one is reported first; a line citing one
+    not reached yet has already failed its own rule check, since that
+    premise was unknown to it.
+    '''
+    for line in proof_lines:
+        if line.number is None:
+            continue
+        if line.number in invalid_lines or not invalid_lines.isdisjoint(line_dependencies.get(line.number, ())):
+            return f"Invalid Deduction at Line {line.number}"
+    return "Valid Deduction"
+
+def validate_proof(proof_lines, workers=1, budget=None, table=None):
+    '''
+    A table already holding the parsed formulas of the lines, such as one
+    filled by Serialize.Archive.proof, spares the sequential mode parsing
+    them again.
+    '''
+    if workers is None or workers > 1:
+        return validate_proof_parallel(proof_lines, workers, budget=budget)
     # First check scopes
     scope_error = check_scopes(proof_lines)
     if scope_error:
         return scope_error
 
+    if table is None:
+        table = FormulaTable(budget)
     known = {}
     invalid_lines = set()
     line_dependencies = {}
 
-    def flatten_refs(refs):
-        result = set()
-        for r in refs:
-            if isinstance(r, tuple):
-                result.update(range(r[0], r[1] + 1))
-            else:
-                result.add(r)
-        return result
-
     for line in proof_lines:
         if line.formula == 'BeginScope' or line.formula == 'EndScope':
             continue
+        if budget is not None:
+            budget.progress['lines checked'] = len(known)
+            budget.step()
+        formula = table.parse(line.formula)
         if line.rule in ('Premise', 'Assumption'):
-            known[line.number] = line.formula
+            known[line.number] = formula
             line_dependencies[line.number] = set()
+            if formula is None:
+                invalid_lines.add(line.number)
             continue
-        expected = rule_output(line.rule, line.references, known, line)
+        expected = rule_output(line.rule, line.references, known, formula, table) if formula is not None else None
         deps = flatten_refs(line.references)
         line_dependencies[line.number] = deps
-        known[line.number] = line.formula
-        if expected is None or expected != line.formula:
+        known[line.number] = formula
+        if expected is None or expected is not formula:
             invalid_lines.add(line.number)
 
-    def depends_on_invalid(line_num, visited=None):
-        if visited is None:
-            visited = set()
-        if line_num in visited:
-            return False
-        visited.add(line_num)
-        if line_num in invalid_lines:
-            return True
-        for dep in line_dependencies.get(line_num, []):
-            if depends_on_invalid(dep, visited):
-                return True
-        return False
+    return first_invalid_line(proof_lines, invalid_lines, line_dependencies)
+
+# ------------------ Parallel Validation ------------------
+
+def _check_chunk(chunk):
+    '''
+    Worker side of validate_proof_parallel. A chunk is (texts, tasks): texts
+    holds every distinct formula of the chunk once and each task is
+    (rule, references, known, formula) with formulas given as indices into
+    texts. Each text is parsed once per chunk. Returns one verdict per task.
+    '''
+    texts, tasks = chunk
+    table = FormulaTable()
+    parsed = [table.parse(text) for text in texts]
+    verdicts = []
+    for rule, refs, known, formula in tasks:
+        conclusion = parsed[formula]
+        if conclusion is None:
+            verdicts.append(False)
+        elif rule in ('Premise', 'Assumption'):
+            verdicts.append(True)
+        else:
+            known = {number: parsed[i] for number, i in known}
+            verdicts.append(rule_output(rule, refs, known, conclusion, table) is conclusion)
+    return verdicts
+
+def validate_proof_parallel(proof_lines, workers=None, chunk_size=256, budget=None):
+    '''
+    Same verdict as validate_proof, computed on a process pool.
+
+    A line's check only reads the formulas it references, and those are
+    fixed by the text, so every check is independent. Lines are cut into
+    chunks of chunk_size checks; each chunk carries just the formulas its
+    lines reference. Verdicts come back in proof order and go through the
+    same dependency pass as the sequential mode, so the reported line is
+    the same.
+
+    Workers do not see the budget: it is charged one step per line as each
+    chunk's verdicts arrive, and chunks not yet started are cancelled once
+    it runs out.
+    '''
+    from concurrent.futures import ProcessPoolExecutor
+
+    scope_error = check_scopes(proof_lines)
+    if scope_error:
+        return scope_error
+
+    known = {}
+    line_dependencies = {}
+    checked = []
+    chunks = []
+    texts, ids, tasks = [], {}, []
+
+    def text_id(text):
+        i = ids.get(text)
+        if i is None:
+            i = ids[text] = len(texts)
+            texts.append(text)
+        return i
 
     for line in proof_lines:
-        if line.number is None:
+        if line.formula == 'BeginScope' or line.formula == 'EndScope':
             continue
-        if depends_on_invalid(line.number):
-            return f"Invalid Deduction at Line {line.number}"
-    return "Valid Deduction"
+        if line.rule in ('Premise', 'Assumption'):
+            deps = set()
+            snapshot = ()
+        else:
+            deps = flatten_refs(line.references)
+            snapshot = tuple((r, text_id(known[r])) for r in deps if r in known)
+        tasks.append((line.rule, line.references, snapshot, text_id(line.formula)))
+        checked.append(line.number)
+        line_dependencies[line.number] = deps
+        known[line.number] = line.formula
+        if len(tasks) == chunk_size:
+            chunks.append((texts, tasks))
+            texts, ids, tasks = [], {}, []
+    if tasks:
+        chunks.append((texts, tasks))
+
+    invalid_lines = set()
+    verdicts = []
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        for chunk in pool.map(_check_chunk, chunks):
+            if budget is not None:
+                budget.progress['lines checked'] = len(verdicts)
+                budget.step(len(chunk))
+            verdicts.extend(chunk)
+    finally:
+        pool.shutdown(cancel_futures=True)
+    for number, verdict in zip(checked, verdicts):
+        if not verdict:
+            invalid_lines.add(number)
+
+    return first_invalid_line(proof_lines, invalid_lines, line_dependencies)
 
 # ------------------ Main Entrypoint ------------------
 
-def run_validator(file_path):
+def proof_key(proof_lines):
+    '''
+    Returns the text of a parsed proof with layout removed: two files get
+    the same key exactly when they differ only in spacing.
+    '''
+    return '\n'.join(
+        line.formula if line.number is None else
+        f"{line.number}|{' '.join(line.formula.split())}|{line.rule}|{line.references}"
+        for line in proof_lines
+    )
+
+
+def run_validator(file_path, workers=1, cache=None, budget=None):
+    '''
+    Validates the proof in file_path. With a ResultCache, a proof already
+    checked by the same engine version is answered from the cache; a run
+    cut short by the budget raises BudgetExceeded and is not cached.
+    '''
     proof_lines = parse_proof_file(file_path)
-    return validate_proof(proof_lines)
+    if cache is None:
+        return validate_proof(proof_lines, workers, budget)
+    return cache.lookup('ND2', engine_version('ND2', 'Natural_Deduction', 'CNF', 'WFF'),
+                        proof_key(proof_lines), lambda: validate_proof(proof_lines, workers, budget))
 
 
 if __name__ == "__main__":
     import sys
 
     file_path = sys.argv[1] if len(sys.argv) > 1 else "ND2.txt"
-    print(run_validator(file_path))
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    cache = default_cache()
+    try:
+        budget = default_budget()
+        print(run_validator(file_path, workers, cache, budget))
+    except BudgetExceeded as e:
+        print(e)
+    except ValueError as e:
+        # A malformed proof or $LOGIC_BUDGET, reported the way CNF and Horn do.
+        print(f"Error: {e}")
+    finally:
+        if cache is not None:
+            cache.close()
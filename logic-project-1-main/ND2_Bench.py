@@ -0,0 +1,64 @@
+import os
+import random
+import sys
+import tempfile
+import time
+from WFF import Parser, tokenize
+from ND2 import inorder, filter, parse_proof_file, validate_proof, validate_proof_parallel
+
+def random_formula(rng, depth):
+    if depth == 0 or rng.random() < 0.1:
+        return rng.choice('pqrs')
+    if rng.random() < 0.2:
+        return f"¬{random_formula(rng, depth - 1)}"
+    op = rng.choice('∧∨→')
+    return f"({random_formula(rng, depth - 1)} {op} {random_formula(rng, depth - 1)})"
+
+def generate_proof(blocks, depth=6, seed=0):
+    '''
+    Writes a long, valid, machine-style proof: blocks of a fresh conjunctive
+    premise followed by ∧e1, ∧e2 and ∧i steps over its halves.
+    '''
+    rng = random.Random(seed)
+    lines = []
+    number = 0
+    for _ in range(blocks):
+        # Write every formula the way the rules print it, so the proof is valid.
+        left, right = (filter(inorder(Parser(tokenize(random_formula(rng, depth))).parse_formula()))
+                       for _ in range(2))
+        p, a, b, c, d = range(number + 1, number + 6)
+        lines.append(f"{p}    ({left}) ∧ ({right})        Premise")
+        lines.append(f"{a}    {left}        ∧e1, {p}")
+        lines.append(f"{b}    {right}        ∧e2, {p}")
+        lines.append(f"{c}    ({right}) ∧ ({left})        ∧i, {b}, {a}")
+        lines.append(f"{d}    ({left}) ∧ ({right})        ∧i, {a}, {b}")
+        number = d
+    return '\n'.join(lines) + '\n'
+
+def main():
+    blocks = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False, encoding='utf-8') as f:
+        f.write(generate_proof(blocks))
+    try:
+        proof_lines = parse_proof_file(f.name)
+    finally:
+        os.remove(f.name)
+
+    print(f"{len(proof_lines)} lines")
+    start = time.perf_counter()
+    verdict = validate_proof(proof_lines)
+    print(f"sequential  {time.perf_counter() - start:8.2f} s                   {verdict}")
+    # Speedups are against the pool at one worker, so every row runs the
+    # same code path.
+    baseline = None
+    for workers in range(1, max_workers + 1):
+        start = time.perf_counter()
+        verdict = validate_proof_parallel(proof_lines, workers)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"workers={workers:<3} {elapsed:8.2f} s   speedup {baseline / elapsed:5.2f}   {verdict}")
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import re
 from CNF import convert_to_postfix
 from WFF import *
 
@@ -34,6 +35,12 @@ def filter(expression: str):
             return expression
     return expression
 
+def is_atomic(formula: str):
+    '''
+    A variable or constant, possibly negated: printed without parentheses.
+    '''
+    return re.fullmatch(r'¬?[^\s()¬∧∨→]+', formula) is not None
+
 def and_intro(formulas, lines):
     if len(lines) != 2:
         return None
@@ -41,7 +48,7 @@ def and_intro(formulas, lines):
         formulas = [filter(formulas[i]) for i in lines]
     except:
         return None
-    return ' ∧ '.join(f"({formulas[i]})" if len(formulas[i]) > 2 else formulas[i] for i in range(len(formulas)))
+    return ' ∧ '.join(formulas[i] if is_atomic(formulas[i]) else f"({formulas[i]})" for i in range(len(formulas)))
 
 def and_elim_1(formulas, lines):
     if len(lines) != 1:
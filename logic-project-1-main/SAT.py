@@ -0,0 +1,307 @@
+'''
+Satisfiability of CNF clause sets, routed to the cheapest engine that
+applies.
+
+Clauses are sequences of signed integer literals, as produced by
+CNF.symbol_clauses or read by DIMACS.read_dimacs.
+
+    horn             every clause has at most one positive literal:
+                     Horn.horn_model decides it in linear time
+    renamable-horn   flipping the polarity of some variables makes it Horn;
+                     the flips are found by a linear 2-SAT instance and the
+                     renamed clauses go to Horn.horn_model
+    search           anything else: branching only on variables of non-Horn
+                     clauses, each residual Horn clause set is handed to
+                     Horn.horn_model, so near-Horn inputs stay cheap
+
+Every entry point takes budget=None; the search charges one step per node it
+visits and records the count as progress, and the budget is passed on to
+Horn.horn_model and the CNF conversion.
+'''
+
+import os
+import sys
+from WFF import Parser, symbols, tokenize
+from CNF import IMPLICATION_FREE, NNF, CNF, symbol_clauses
+from Horn import horn_model
+from Budget import default_budget
+
+
+def normalize(clauses):
+    '''
+    Returns the clauses as lists without repeated literals, dropping the
+    tautologies (clauses holding both p and ¬p).
+    '''
+    result = []
+    for clause in clauses:
+        literals = list(dict.fromkeys(clause))
+        seen = set(literals)
+        if not any(-literal in seen for literal in literals):
+            result.append(literals)
+    return result
+
+
+def is_horn(clauses):
+    for clause in clauses:
+        positives = 0
+        for literal in clause:
+            if literal > 0:
+                positives += 1
+                if positives > 1:
+                    return False
+    return True
+
+
+# ------------------ 2-SAT ------------------
+
+def solve_2sat(num_vars, implications):
+    '''
+    precondition: variables are 0 .. num_vars - 1 and literal 2v means v,
+                  2v + 1 means ¬v; implications is a list of pairs (a, b)
+                  standing for the clause ¬a ∨ b
+    postcondition: returns a list of booleans satisfying every clause, or
+                   None. Uses Tarjan's strongly connected components, so it
+                   runs in linear time.
+    '''
+    size = 2 * num_vars
+    graph = [[] for _ in range(size)]
+    for a, b in implications:
+        graph[a].append(b)
+        graph[b ^ 1].append(a ^ 1)
+
+    index = [None] * size
+    lowlink = [0] * size
+    component = [None] * size
+    on_stack = [False] * size
+    stack = []
+    counter = 0
+    components = 0
+    for root in range(size):
+        if index[root] is not None:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, edge = work.pop()
+            if edge == 0:
+                index[node] = lowlink[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack[node] = True
+            else:
+                child = graph[node][edge - 1]
+                lowlink[node] = min(lowlink[node], lowlink[child])
+            while edge < len(graph[node]):
+                child = graph[node][edge]
+                edge += 1
+                if index[child] is None:
+                    work.append((node, edge))
+                    work.append((child, 0))
+                    break
+                if on_stack[child]:
+                    lowlink[node] = min(lowlink[node], index[child])
+            else:
+                if lowlink[node] == index[node]:
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component[member] = components
+                        if member == node:
+                            break
+                    components += 1
+
+    values = []
+    for var in range(num_vars):
+        if component[2 * var] == component[2 * var + 1]:
+            return None
+        # Tarjan numbers components in reverse topological order.
+        values.append(component[2 * var] < component[2 * var + 1])
+    return values
+
+
+def horn_renaming(clauses):
+    '''
+    Returns the set of variables whose polarity must be flipped to make the
+    clauses Horn, or None if there is no such renaming.
+
+    Flip variable v when f(v) holds. Literal l is positive after renaming
+    when pos(l) = (l > 0) xor f(|l|); every clause needs "at most one pos(l)",
+    which a ladder of auxiliary variables states with two-literal clauses
+    only, linear in the clause length.
+    '''
+    variables = {}
+    for clause in clauses:
+        for literal in clause:
+            variables.setdefault(abs(literal), len(variables))
+    num_vars = len(variables)
+    implications = []
+
+    def fresh():
+        nonlocal num_vars
+        num_vars += 1
+        return 2 * (num_vars - 1)
+
+    for clause in clauses:
+        if len(clause) < 2:
+            continue
+        # pos(l) as a 2-SAT literal: ¬f(v) for positive l, f(v) for negative.
+        pos = [2 * variables[abs(l)] + (1 if l > 0 else 0) for l in clause]
+        ladder = [fresh() for _ in range(len(pos) - 1)]
+        implications.append((pos[0], ladder[0]))
+        for i in range(1, len(pos) - 1):
+            implications.append((pos[i], ladder[i]))
+            implications.append((ladder[i - 1], ladder[i]))
+            implications.append((ladder[i - 1], pos[i] ^ 1))
+        implications.append((ladder[-1], pos[-1] ^ 1))
+
+    values = solve_2sat(num_vars, implications)
+    if values is None:
+        return None
+    return {var for var, i in variables.items() if values[i]}
+
+
+# ------------------ Search ------------------
+
+def propagate(clauses, assignment):
+    '''
+    Applies assignment and unit propagation, extending assignment in place.
+    Returns the clauses still undecided, or None on a conflict.
+    '''
+    while True:
+        residual = []
+        units = []
+        for clause in clauses:
+            literals = []
+            satisfied = False
+            for literal in clause:
+                value = assignment.get(abs(literal))
+                if value is None:
+                    literals.append(literal)
+                elif value == (literal > 0):
+                    satisfied = True
+                    break
+            if satisfied:
+                continue
+            if not literals:
+                return None
+            if len(literals) == 1:
+                units.append(literals[0])
+            residual.append(literals)
+        if not units:
+            return residual
+        for literal in units:
+            if assignment.get(abs(literal), literal > 0) != (literal > 0):
+                return None
+            assignment[abs(literal)] = literal > 0
+        clauses = residual
+
+
+def search(clauses, budget=None):
+    '''
+    Depth-first search that only branches on the positive literals of
+    non-Horn clauses. Returns (model, nodes) with model None when the
+    clauses are unsatisfiable.
+    '''
+    stack = [{}]
+    nodes = 0
+    while stack:
+        assignment = stack.pop()
+        nodes += 1
+        if budget is not None:
+            budget.progress['search nodes'] = nodes
+            budget.step()
+        residual = propagate(clauses, assignment)
+        if residual is None:
+            continue
+        pivot = None
+        for clause in residual:
+            positives = [literal for literal in clause if literal > 0]
+            if len(positives) > 1:
+                pivot = positives[0]
+                break
+        if pivot is None:
+            true_vars = horn_model(residual, budget)
+            if true_vars is None:
+                continue
+            for clause in residual:
+                for literal in clause:
+                    assignment.setdefault(abs(literal), abs(literal) in true_vars)
+            return assignment, nodes
+        stack.append({**assignment, pivot: False})
+        stack.append({**assignment, pivot: True})
+    return None, nodes
+
+
+# ------------------ Dispatcher ------------------
+
+def solve(clauses, budget=None):
+    '''
+    precondition: clauses is an iterable of clauses of signed integers
+    postcondition: returns (satisfiable, model, engine) where model maps
+                   every variable of the clauses to a bool (None when
+                   unsatisfiable) and engine names the route taken; raises
+                   BudgetExceeded when budget runs out
+    '''
+    clauses = [list(clause) for clause in clauses]
+    variables = {abs(literal) for clause in clauses for literal in clause}
+    clauses = normalize(clauses)
+
+    if is_horn(clauses):
+        true_vars = horn_model(clauses, budget)
+        if true_vars is None:
+            return False, None, 'horn'
+        return True, {var: var in true_vars for var in variables}, 'horn'
+
+    flips = horn_renaming(clauses)
+    if flips is not None:
+        renamed = [[-l if abs(l) in flips else l for l in clause] for clause in clauses]
+        true_vars = horn_model(renamed, budget)
+        if true_vars is None:
+            return False, None, 'renamable-horn'
+        return True, {var: (var in true_vars) != (var in flips) for var in variables}, 'renamable-horn'
+
+    model, _ = search(clauses, budget)
+    if model is None:
+        return False, None, 'search'
+    return True, {var: model.get(var, False) for var in variables}, 'search'
+
+
+def solve_formula(expression: str, budget=None):
+    '''
+    Converts an infix WFF to CNF and solves it; the model maps variable
+    names to bools.
+    '''
+    imp = IMPLICATION_FREE(expression)
+    tree = CNF(NNF(Parser(tokenize(imp), budget=budget).parse_formula(), budget), budget)
+    answer, model, engine = solve(symbol_clauses(tree), budget)
+    if model is not None:
+        model = {symbols.name(var - 1): value for var, value in model.items()}
+    return answer, model, engine
+
+
+def main():
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    input_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(current_dir, "CNF_Input.txt")
+
+    try:
+        budget = default_budget()
+        if input_path.endswith('.cnf'):
+            from DIMACS import read_dimacs
+            answer, model, engine = solve(read_dimacs(input_path).clauses(), budget)
+        else:
+            with open(input_path, "r", encoding="utf-8") as f:
+                expression = f.readline().strip()
+                if not expression:
+                    raise ValueError("Input file is empty.")
+            answer, model, engine = solve_formula(expression, budget)
+        print(f"{'Satisfiable' if answer else 'Unsatisfiable'} ({engine})")
+        if answer:
+            trues = [str(var) for var, value in sorted(model.items(), key=str) if value]
+            if trues:
+                print(' '.join(trues))
+
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
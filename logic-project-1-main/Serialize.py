@@ -0,0 +1,548 @@
+'''
+Compact binary images of parsed formulas and proofs.
+
+An image is one flat little-endian buffer:
+
+    header    MAGIC, VERSION, kind, record count, symbol count
+    symbols   u32 offset table followed by the UTF-8 bytes of every symbol
+    index     record count + 1 u32 word offsets into the code area
+    code      u32 words
+
+A formula is stored as a postfix opcode stream. Every word holds an opcode in
+its low 3 bits and an operand in the remaining bits:
+
+    VAR  s    push the leaf whose text is symbol s (variables, ⊤ and ⊥)
+    NOT       pop one node, push ¬node
+    AND/OR/IMP pop right, pop left, push the binary node
+    REF  k    push the k-th node built so far in this record again
+
+Identical subformulas are emitted once and reused through REF, so the image
+is a DAG and decoding gives back shared Node objects. A formula record equal
+to an earlier record j is the single word REF j: it is stored once, and
+decoded once however many records repeat it.
+
+A proof is a run of line records (see encode_proof). Each line carries its
+formula as an opcode stream too, and the REF slots of one proof are shared
+by all its lines, so a subformula repeated down the proof is written once
+and decoded once. Decoding a proof into a FormulaTable hands the validator
+its parsed, hash-consed formulas without running tokenize or Parser. Rule
+names and raw lines go through the symbol table, so a text repeated over
+many lines or many proofs is stored once.
+
+Decoding never copies the buffer: it reads through a memoryview cast to u32,
+so an image opened with load_archive is an mmap that many worker processes
+can share from the page cache.
+'''
+
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from collections.abc import Sequence
+from WFF import Node, Parser, SymbolTable, tokenize
+from ND2 import FormulaTable, ProofLine, parse_proof_file, validate_proof
+
+MAGIC = b'CCBN'
+VERSION = 2
+
+KIND_FORMULAS = 1
+KIND_PROOFS = 2
+
+OP_VAR, OP_NOT, OP_AND, OP_OR, OP_IMP, OP_REF = range(6)
+OP_BITS = 3
+OP_MASK = (1 << OP_BITS) - 1
+
+BINARY_OPS = {'∧': OP_AND, '∨': OP_OR, '→': OP_IMP}
+OP_VALUES = {OP_AND: '∧', OP_OR: '∨', OP_IMP: '→'}
+
+LINE, BEGIN_SCOPE, END_SCOPE = range(3)
+NO_SYMBOL = 0xFFFFFFFF
+REF_RANGE = 0x80000000
+
+_HEADER = struct.Struct('<4sHHII')
+
+
+# ------------------ Encoding ------------------
+
+def encode_formula(tree: Node, symbols: SymbolTable, out: array, slots=None, keys=None):
+    '''
+    precondition: tree is a parsed WFF; slots and keys, when given, are the
+                  tables of the streams already written into the same REF
+                  space, and the trees they saw are still alive
+    postcondition: appends the postfix opcode stream of tree to out
+    '''
+    if slots is None:
+        slots = {}  # structural key -> slot of the first node with that shape
+    if keys is None:
+        keys = {}   # id(node) -> structural key, filled bottom-up
+    stack = [(tree, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if not expanded:
+            if id(node) in keys:
+                out.append(slots[keys[id(node)]] << OP_BITS | OP_REF)
+                continue
+            stack.append((node, True))
+            if node.right is not None:
+                stack.append((node.right, False))
+            if node.left is not None:
+                stack.append((node.left, False))
+            continue
+        if node.left is None:
+            key = (OP_VAR, symbols.intern(node.value))
+        elif node.value == '¬':
+            key = (OP_NOT, keys[id(node.left)])
+        else:
+            key = (BINARY_OPS[node.value], keys[id(node.left)], keys[id(node.right)])
+        keys[id(node)] = key
+        slot = slots.get(key)
+        if slot is not None:
+            # The children were already written, drop them and reuse the slot.
+            _drop_last_node(out, key)
+            out.append(slot << OP_BITS | OP_REF)
+            continue
+        slots[key] = len(slots)
+        if key[0] == OP_VAR:
+            out.append(key[1] << OP_BITS | OP_VAR)
+        else:
+            out.append(key[0])
+
+
+def _drop_last_node(out: array, key):
+    '''
+    Removes the children that were just emitted for a node which turned out
+    to be a repeat. The children of a repeated node are themselves repeats,
+    so each of them was written as a single REF word.
+    '''
+    if key[0] == OP_NOT:
+        out.pop()
+    elif key[0] != OP_VAR:
+        out.pop()
+        out.pop()
+
+
+def _pack(kind, symbols: SymbolTable, index, code: array):
+    encoded = [name.encode('utf-8') for name in symbols.names]
+    offsets = array('I', [0])
+    for blob in encoded:
+        offsets.append(offsets[-1] + len(blob))
+    blob = b''.join(encoded)
+    blob += b'\0' * (-len(blob) % 4)
+    index = array('I', index)
+    if sys.byteorder != 'little':
+        for words in (offsets, index, code):
+            words.byteswap()
+    header = _HEADER.pack(MAGIC, VERSION, kind, len(index) - 1, len(symbols.names))
+    return b''.join((header, offsets.tobytes(), blob, index.tobytes(), code.tobytes()))
+
+
+def dumps_formulas(trees):
+    '''
+    precondition: trees is an iterable of parsed WFFs
+    postcondition: returns the binary image holding every tree, in order
+    '''
+    symbols = SymbolTable()
+    code = array('I')
+    index = [0]
+    first = {}  # encoded record -> number of the first record holding it
+    for tree in trees:
+        record = array('I')
+        encode_formula(tree, symbols, record)
+        number = first.setdefault(record.tobytes(), len(index) - 1)
+        if number == len(index) - 1:
+            code.extend(record)
+        else:
+            code.append(number << OP_BITS | OP_REF)
+        index.append(len(code))
+    return _pack(KIND_FORMULAS, symbols, index, code)
+
+
+def encode_proof(proof_lines, symbols: SymbolTable, out: array):
+    '''
+    Appends one proof to out:
+
+        line count, code size, code..., text count, (text, tree)...,
+        line records...
+
+    code is one opcode stream leaving the formula of every distinct line
+    text on the stack in turn, so repeats of a subformula anywhere in the
+    proof become REF words. Each (text, tree) pair gives the stack position
+    of the formula of one text (NO_SYMBOL when it is not a WFF). Every line
+    record is
+
+        tag | scope_level << 2, number, rule, text, raw, refcount, refs...
+
+    where a range reference a-b is the two words a | REF_RANGE, b.
+    '''
+    intern = symbols.intern
+    table = FormulaTable()
+    code = array('I')
+    slots, keys, positions, texts = {}, {}, {}, {}
+    records = array('I')
+    for line in proof_lines:
+        if line.formula == 'BeginScope' and line.number is None:
+            tag = BEGIN_SCOPE
+        elif line.formula == 'EndScope' and line.number is None:
+            tag = END_SCOPE
+        else:
+            tag = LINE
+        if tag == LINE and line.formula not in texts:
+            tree = table.parse(line.formula)
+            if tree is None:
+                texts[line.formula] = NO_SYMBOL
+            else:
+                if id(tree) not in positions:
+                    positions[id(tree)] = len(positions)
+                    encode_formula(tree, symbols, code, slots, keys)
+                texts[line.formula] = positions[id(tree)]
+        records.append(tag | line.scope_level << 2)
+        records.append(NO_SYMBOL if line.number is None else line.number)
+        records.append(NO_SYMBOL if line.rule is None else intern(line.rule))
+        records.append(NO_SYMBOL if line.formula is None else intern(line.formula))
+        records.append(intern(line.raw))
+        records.append(len(line.references))
+        for ref in line.references:
+            if isinstance(ref, tuple):
+                records.append(ref[0] | REF_RANGE)
+                records.append(ref[1])
+            else:
+                records.append(ref)
+    out.append(len(proof_lines))
+    out.append(len(code))
+    out.extend(code)
+    out.append(len(texts))
+    for text, position in texts.items():
+        out.append(intern(text))
+        out.append(position)
+    out.extend(records)
+
+
+def dumps_proofs(proofs):
+    '''
+    precondition: proofs is an iterable of lists of ProofLine
+    postcondition: returns the binary image holding every proof, in order
+    '''
+    symbols = SymbolTable()
+    code = array('I')
+    index = [0]
+    for proof_lines in proofs:
+        encode_proof(proof_lines, symbols, code)
+        index.append(len(code))
+    return _pack(KIND_PROOFS, symbols, index, code)
+
+
+# ------------------ Decoding ------------------
+
+class Archive:
+    '''
+    Read-only view over a binary image. Records are decoded on demand, so
+    opening a large memory-mapped corpus costs nothing until it is indexed.
+    '''
+    def __init__(self, buffer, owner=None):
+        view = memoryview(buffer)
+        if len(view) < _HEADER.size:
+            raise ValueError("Truncated image")
+        magic, version, kind, count, nsym = _HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError("Not a binary formula image")
+        if version != VERSION:
+            raise ValueError(f"Unsupported image version {version}")
+        self.kind = kind
+        self.count = count
+        self._owner = owner
+        pos = _HEADER.size
+        offsets = _words(view[pos:pos + 4 * (nsym + 1)])
+        pos += 4 * (nsym + 1)
+        size = offsets[-1]
+        self._strings = view[pos:pos + size]
+        self._offsets = offsets
+        self._names = [None] * nsym
+        self._leaves = {}
+        self._repeated = {}
+        pos += size + (-size % 4)
+        self._index = _words(view[pos:pos + 4 * (count + 1)])
+        pos += 4 * (count + 1)
+        self._code = _words(view[pos:])
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("record index out of range")
+        start, end = self._index[i], self._index[i + 1]
+        if self.kind == KIND_FORMULAS:
+            return self._decode_formula(start, end)
+        return self._decode_proof(start, end, None)
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+    def proof(self, i, table: FormulaTable):
+        '''
+        Returns proof i, building the formula of every line in table, which
+        from then on answers table.parse for those texts without parsing.
+        '''
+        if self.kind != KIND_PROOFS:
+            raise ValueError("Image does not hold proofs")
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("record index out of range")
+        return self._decode_proof(self._index[i], self._index[i + 1], table)
+
+    def symbol(self, sid):
+        '''
+        Returns the text of symbol sid, decoding it only once.
+        '''
+        name = self._names[sid]
+        if name is None:
+            name = str(self._strings[self._offsets[sid]:self._offsets[sid + 1]], 'utf-8')
+            self._names[sid] = name
+        return name
+
+    def _run(self, words, node, leaves):
+        '''
+        Runs an opcode stream, building nodes with node, and returns the
+        stack it leaves behind.
+        '''
+        built = []
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        for word in words:
+            op = word & OP_MASK
+            if op == OP_REF:
+                push(built[word >> OP_BITS])
+                continue
+            if op == OP_VAR:
+                # Nodes are never mutated, so one leaf per symbol is shared.
+                formula = leaves.get(word)
+                if formula is None:
+                    formula = leaves[word] = node(self.symbol(word >> OP_BITS))
+            elif op == OP_NOT:
+                formula = node('¬', pop())
+            else:
+                right = pop()
+                formula = node(OP_VALUES[op], pop(), right)
+            built.append(formula)
+            push(formula)
+        return stack
+
+    def _decode_formula(self, start, end):
+        if end - start == 1 and self._code[start] & OP_MASK == OP_REF:
+            first = self._code[start] >> OP_BITS
+            formula = self._repeated.get(first)
+            if formula is None:
+                formula = self._repeated[first] = self[first]
+            return formula
+        stack = self._run(self._code[start:end], Node, self._leaves)
+        if len(stack) != 1:
+            raise ValueError("Corrupt formula record")
+        return stack[0]
+
+    def _decode_proof(self, start, end, table):
+        words = self._code[start:end].tolist()
+        pos = 2 + words[1]
+        count = words[pos]
+        pos += 1
+        if table is not None:
+            trees = self._run(words[2:pos - 1], table.node, {})
+            parsed = table.parsed
+            for k in range(pos, pos + 2 * count, 2):
+                tree = words[k + 1]
+                parsed[self.symbol(words[k])] = None if tree == NO_SYMBOL else trees[tree]
+        return ProofRecord(self, words, pos + 2 * count)
+
+    def _decode_lines(self, words, pos):
+        names = self._names
+        symbol = self.symbol
+        proof = []
+        for _ in range(words[0]):
+            head, number, rule, text, raw, nrefs = words[pos:pos + 6]
+            pos += 6
+            text = None if text == NO_SYMBOL else names[text] or symbol(text)
+            raw = names[raw] or symbol(raw)
+            if head & 3 != LINE:
+                proof.append(ProofLine(None, text, None, None, head >> 2, raw))
+                continue
+            refs = []
+            for _ in range(nrefs):
+                ref = words[pos]
+                if ref & REF_RANGE:
+                    refs.append((ref & ~REF_RANGE, words[pos + 1]))
+                    pos += 2
+                else:
+                    refs.append(ref)
+                    pos += 1
+            rule = None if rule == NO_SYMBOL else names[rule] or symbol(rule)
+            proof.append(ProofLine(number, text, rule, refs, head >> 2, raw))
+        if pos != len(words):
+            raise ValueError("Corrupt proof record")
+        return proof
+
+    def close(self):
+        '''
+        Releases the views and, for mapped images, the mapping itself.
+        '''
+        for view in (self._code, self._index, self._offsets, self._strings):
+            if isinstance(view, memoryview):
+                view.release()
+        if self._owner is not None:
+            self._owner.close()
+            self._owner = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ProofRecord(Sequence):
+    '''
+    The lines of one proof of an archive, as a read-only sequence of
+    ProofLine. The ProofLine objects are built the first time a line is
+    read, not when the record is loaded, so read them before closing the
+    archive.
+    '''
+    def __init__(self, archive: Archive, words, lines_at):
+        self._archive = archive
+        self._words = words
+        self._lines_at = lines_at
+        self._lines = None
+
+    def lines(self):
+        if self._lines is None:
+            self._lines = self._archive._decode_lines(self._words, self._lines_at)
+        return self._lines
+
+    def __len__(self):
+        return self._words[0]
+
+    def __getitem__(self, i):
+        return self.lines()[i]
+
+    def __iter__(self):
+        return iter(self.lines())
+
+
+def _words(view: memoryview):
+    if sys.byteorder == 'little':
+        return view.cast('I')
+    # Big-endian hosts pay for one copy; the on-disk layout stays fixed.
+    words = array('I', view)
+    words.byteswap()
+    return words
+
+
+def loads_formulas(buffer):
+    '''
+    Decodes every formula of an image built by dumps_formulas.
+    '''
+    archive = Archive(buffer)
+    if archive.kind != KIND_FORMULAS:
+        raise ValueError("Image does not hold formulas")
+    return list(archive)
+
+
+def loads_proofs(buffer):
+    '''
+    Decodes every proof of an image built by dumps_proofs.
+    '''
+    archive = Archive(buffer)
+    if archive.kind != KIND_PROOFS:
+        raise ValueError("Image does not hold proofs")
+    return list(archive)
+
+
+# ------------------ Files ------------------
+
+def dump_archive(image: bytes, path):
+    '''
+    Writes an image atomically, so readers never map a half-written file.
+    '''
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(image)
+    os.replace(tmp, path)
+
+
+def load_archive(path):
+    '''
+    Memory-maps an image read-only. The pages are shared by every process
+    that maps the same file.
+    '''
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return Archive(mapped, owner=mapped)
+
+
+# ------------------ Benchmark ------------------
+
+def main():
+    '''
+    Compares re-parsing the text of a proof and its formulas with loading
+    them back from the binary image.
+    '''
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    file_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(current_dir, "ND2.txt")
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    proof = parse_proof_file(file_path)
+    texts = [line.formula for line in proof if line.number is not None] * repeat
+
+    def parse_all():
+        trees = []
+        for text in texts:
+            trees.append(Parser(tokenize(text, extra='⊤⊥'), extra='⊤⊥').parse_formula())
+        return trees
+
+    start = time.perf_counter()
+    trees = parse_all()
+    parse_time = time.perf_counter() - start
+
+    image = dumps_formulas(trees)
+    start = time.perf_counter()
+    loads_formulas(image)
+    load_time = time.perf_counter() - start
+    print(f"formulas: {len(texts)}  image: {len(image)} bytes")
+    print(f"  parse {parse_time * 1000:.1f} ms   load {load_time * 1000:.1f} ms")
+
+    def parse_proof():
+        lines = parse_proof_file(file_path)
+        table = FormulaTable()
+        for line in lines:
+            if line.number is not None:
+                table.parse(line.formula)
+        return lines, table
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse_proof()
+    parse_time = time.perf_counter() - start
+
+    image = dumps_proofs([proof] * repeat)
+    archive = Archive(image)
+    start = time.perf_counter()
+    for i in range(repeat):
+        archive.proof(i, FormulaTable())
+    load_time = time.perf_counter() - start
+    print(f"proofs: {repeat}  image: {len(image)} bytes")
+    print(f"  parse {parse_time * 1000:.1f} ms   load {load_time * 1000:.1f} ms")
+
+    lines, table = parse_proof()
+    verdict = validate_proof(lines)
+    loaded = FormulaTable()
+    if validate_proof(archive.proof(0, loaded), table=loaded) != verdict:
+        raise ValueError("Loaded proof gets a different verdict")
+    print(f"  {verdict}")
+    archive.close()
+
+if __name__ == "__main__":
+    main()
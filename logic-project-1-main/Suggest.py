@@ -0,0 +1,256 @@
+'''
+Rule-applicability index for natural deduction.
+
+RuleIndex keeps the live lines of a proof keyed by the subformulas that the
+rules of Natural_Deduction look at:
+
+    implications by φ     lines of the form φ → ψ          (→e)
+    implications by ψ     lines of the form φ → ψ          (MT)
+    negations by φ        lines of the form ¬φ             (MT)
+    formulas              every line, by its canonical text
+    postfix               every line, by its postfix text  (¬e)
+    negations by postfix  lines whose postfix is that of φ
+                          followed by ¬                    (¬e)
+
+Keys are taken the way each rule compares its premises. →e and MT compare
+the inorder text of WFF.Parser trees, but negation_elim compares
+CNF.convert_to_postfix output, which gives ∧ precedence over ∨ over →
+where the parser reads left to right, so ¬e has buckets of its own.
+
+Each formula is parsed once when its line is added. Matching a rule is then a
+dictionary lookup instead of a parse of every candidate pair, so enumerating
+the suggestions costs time proportional to their number.
+
+A suggestion is a tuple (rule, lines, output) that can be fed straight back
+to Natural_Deduction.apply_rule(formulas, rule, lines).
+'''
+
+import os
+import sys
+from WFF import Parser, tokenize
+from CNF import convert_to_postfix
+from Natural_Deduction import inorder, filter, is_atomic
+from ND2 import parse_proof_file
+
+
+class IndexedLine:
+    def __init__(self, number, formula):
+        self.number = number
+        self.text = filter(formula.strip())
+        self.tree = Parser(tokenize(self.text, extra='⊤⊥'), extra='⊤⊥').parse_formula()
+        self.key = inorder(self.tree)
+        try:
+            self.postfix = convert_to_postfix(formula)
+        except Exception:
+            # negation_elim rejects what convert_to_postfix cannot read,
+            # ⊤ and ⊥ among it.
+            self.postfix = None
+
+
+class RuleIndex:
+    def __init__(self):
+        self.lines = {}
+        self.by_key = {}
+        self.implications_by_antecedent = {}
+        self.implications_by_consequent = {}
+        self.negations_by_body = {}
+        self.by_postfix = {}
+        self.negations_by_postfix = {}
+        self.scopes = []
+
+    # ------------------ Maintenance ------------------
+
+    def _buckets(self, entry: IndexedLine):
+        '''
+        Yields (bucket, key) for every place entry is filed under.
+        '''
+        tree = entry.tree
+        yield self.by_key, entry.key
+        if tree.is_implication():
+            yield self.implications_by_antecedent, inorder(tree.left)
+            yield self.implications_by_consequent, inorder(tree.right)
+        elif tree.is_negation():
+            yield self.negations_by_body, inorder(tree.left)
+        if entry.postfix is not None:
+            yield self.by_postfix, entry.postfix
+            if entry.postfix.endswith(' ¬'):
+                yield self.negations_by_postfix, entry.postfix[:-2]
+
+    def add_line(self, number, formula):
+        '''
+        precondition: number is not yet in the index and formula is a WFF
+        postcondition: the line is indexed and returns the suggestions that
+                       use it, which are exactly the new ones
+        '''
+        if number in self.lines:
+            raise ValueError(f"Line {number} is already indexed")
+        entry = IndexedLine(number, formula)
+        entry.buckets = [(bucket, key) for bucket, key in self._buckets(entry)]
+        for bucket, key in entry.buckets:
+            bucket.setdefault(key, {})[number] = entry
+        self.lines[number] = entry
+        if self.scopes:
+            self.scopes[-1].append(number)
+        return list(self.suggestions_for(number))
+
+    def remove_line(self, number):
+        entry = self.lines.pop(number)
+        for bucket, key in entry.buckets:
+            group = bucket[key]
+            del group[number]
+            if not group:
+                del bucket[key]
+
+    def open_scope(self):
+        self.scopes.append([])
+
+    def close_scope(self):
+        '''
+        Lines of a closed box can no longer be referenced, so they leave the
+        index.
+        '''
+        for number in self.scopes.pop():
+            self.remove_line(number)
+
+    @classmethod
+    def from_proof(cls, proof_lines):
+        '''
+        Builds the index for the state reached after the last line of a
+        parsed ND2 proof.
+        '''
+        index = cls()
+        for line in proof_lines:
+            if line.number is None:
+                if line.formula == 'BeginScope':
+                    index.open_scope()
+                else:
+                    index.close_scope()
+            else:
+                index.add_line(line.number, line.formula)
+        return index
+
+    # ------------------ Queries ------------------
+
+    def _lookup(self, bucket, key=None):
+        return bucket.get(key, {}).values()
+
+    def _one_premise(self, entry: IndexedLine):
+        tree = entry.tree
+        if tree.is_conjunction():
+            yield ('∧e1', [entry.number], filter(inorder(tree.left)))
+            yield ('∧e2', [entry.number], filter(inorder(tree.right)))
+        if tree.is_double_negation():
+            yield ('¬¬e', [entry.number], filter(inorder(tree.left.left)))
+        text = entry.text
+        yield ('¬¬i', [entry.number], f"¬¬{text}" if tree.is_literal() else f"¬¬({text})")
+
+    def _and_intro(self, first: IndexedLine, second: IndexedLine):
+        return ('∧i', [first.number, second.number], ' ∧ '.join(
+            text if is_atomic(text) else f"({text})" for text in (first.text, second.text)
+        ))
+
+    def _pairs_with(self, entry: IndexedLine):
+        '''
+        Yields the two-premise instances where entry fills either premise.
+        '''
+        tree = entry.tree
+        key = entry.key
+        number = entry.number
+        # entry as the premise φ of →e, ¬e and the negation of MT
+        for imp in self._lookup(self.implications_by_antecedent, key):
+            yield ('→e', [imp.number, number], filter(inorder(imp.tree.right)))
+        postfix = entry.postfix
+        if postfix is not None:
+            for neg in self._lookup(self.negations_by_postfix, postfix):
+                yield ('¬e', [number, neg.number], '⊥')
+            if postfix.endswith(' ¬'):
+                for premise in self._lookup(self.by_postfix, postfix[:-2]):
+                    if premise is not entry:
+                        yield ('¬e', [premise.number, number], '⊥')
+        if tree.is_negation():
+            body = inorder(tree.left)
+            if '⊤' not in body and '⊥' not in body:
+                for imp in self._lookup(self.implications_by_consequent, body):
+                    yield ('MT', [imp.number, number], filter(f"(¬{inorder(imp.tree.left)})"))
+        if tree.is_implication():
+            consequent = filter(inorder(tree.right))
+            antecedent = filter(f"(¬{inorder(tree.left)})")
+            for premise in self._lookup(self.by_key, inorder(tree.left)):
+                if premise is not entry:
+                    yield ('→e', [number, premise.number], consequent)
+            for neg in self._lookup(self.negations_by_body, inorder(tree.right)):
+                if neg is not entry and '⊤' not in neg.key and '⊥' not in neg.key:
+                    yield ('MT', [number, neg.number], antecedent)
+
+    def suggestions_for(self, number, conjoin=True):
+        '''
+        Yields every applicable rule instance that references line number.
+        '''
+        entry = self.lines[number]
+        yield from self._one_premise(entry)
+        yield from self._pairs_with(entry)
+        if conjoin:
+            for other in self.lines.values():
+                if other is not entry:
+                    yield self._and_intro(entry, other)
+                    yield self._and_intro(other, entry)
+
+    def suggestions(self, goal=None, conjoin=True):
+        '''
+        Yields every applicable one- and two-premise rule instance over the
+        live lines. ∧i pairs every two lines, so it comes last and can be
+        switched off with conjoin=False.
+
+        With a goal formula, the rules whose output is not fixed by their
+        premises are also offered when they reach the goal: Copy, ⊥e, ∨i1
+        and ∨i2.
+        '''
+        for entry in self.lines.values():
+            yield from self._one_premise(entry)
+        for key, implications in self.implications_by_antecedent.items():
+            for premise in self._lookup(self.by_key, key):
+                for imp in implications.values():
+                    yield ('→e', [imp.number, premise.number], filter(inorder(imp.tree.right)))
+        for key, negations in self.negations_by_postfix.items():
+            for premise in self._lookup(self.by_postfix, key):
+                for neg in negations.values():
+                    yield ('¬e', [premise.number, neg.number], '⊥')
+        # modus_tollens strips parentheses with filter, which goes through
+        # convert_to_postfix and so keeps them around ⊤ and ⊥.
+        for key, implications in self.implications_by_consequent.items():
+            if '⊤' in key or '⊥' in key:
+                continue
+            for neg in self._lookup(self.negations_by_body, key):
+                for imp in implications.values():
+                    yield ('MT', [imp.number, neg.number], filter(f"(¬{inorder(imp.tree.left)})"))
+        if goal is not None:
+            yield from self._towards(goal)
+        if conjoin:
+            for first in self.lines.values():
+                for second in self.lines.values():
+                    if first is not second:
+                        yield self._and_intro(first, second)
+
+    def _towards(self, goal):
+        target = IndexedLine(None, goal)
+        for entry in self._lookup(self.by_key, target.key):
+            yield ('Copy', [entry.number], target.text)
+        for entry in self._lookup(self.by_key, '⊥'):
+            yield ('⊥e', [entry.number], target.text)
+        if target.tree.is_disjunction():
+            for entry in self._lookup(self.by_key, inorder(target.tree.left)):
+                yield ('∨i1', [entry.number], target.text)
+            for entry in self._lookup(self.by_key, inorder(target.tree.right)):
+                yield ('∨i2', [entry.number], target.text)
+
+
+def main():
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    file_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(current_dir, "ND2.txt")
+    index = RuleIndex.from_proof(parse_proof_file(file_path))
+    for rule, lines, output in index.suggestions(conjoin=False):
+        print(f"{rule}, {', '.join(map(str, lines))}    {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+'''
+Streaming reduction from CNF to 3-SAT.
+
+to_3sat consumes clauses one at a time, from CNF.clauses or from a DIMACS
+file, and yields clauses of exactly three literals:
+
+    ()                  8 clauses over 3 fresh variables, all sign patterns
+    (l)                 (l ∨ y1 ∨ y2) (l ∨ y1 ∨ ¬y2) (l ∨ ¬y1 ∨ y2) (l ∨ ¬y1 ∨ ¬y2)
+    (l1 ∨ l2)           (l1 ∨ l2 ∨ y) (l1 ∨ l2 ∨ ¬y)
+    (l1 ∨ l2 ∨ l3)      unchanged
+    (l1 ∨ ... ∨ lk)     (l1 ∨ l2 ∨ y1) (¬y1 ∨ l3 ∨ y2) ... (¬yk-3 ∨ lk-1 ∨ lk)
+
+The result is satisfiable exactly when the input is. Work is linear in the
+input and only the current clause is held in memory.
+
+Literals are either strings as printed by the CNF module ('p', '¬p') or
+DIMACS integers; fresh variables come from FreshNames or FreshNumbers
+accordingly.
+'''
+
+import os
+import sys
+from WFF import Parser, tokenize, variables
+from CNF import IMPLICATION_FREE, NNF, CNF, clauses
+
+
+class FreshNames:
+    '''
+    Auxiliary variables y1, y2, ... skipping every name in taken, which
+    should hold the variables of the input formula.
+    '''
+    def __init__(self, taken=(), prefix='y'):
+        self.taken = set(taken)
+        self.prefix = prefix
+        self.count = 0
+        self.issued = 0
+
+    def new(self):
+        while True:
+            self.count += 1
+            name = f"{self.prefix}{self.count}"
+            if name not in self.taken:
+                self.issued += 1
+                return name
+
+    @staticmethod
+    def negate(literal):
+        return literal[1:] if literal.startswith('¬') else '¬' + literal
+
+
+class FreshNumbers:
+    '''
+    Auxiliary DIMACS variables numbered after the num_vars input ones.
+    '''
+    def __init__(self, num_vars):
+        self.next = num_vars + 1
+        self.issued = 0
+
+    def new(self):
+        number = self.next
+        self.next += 1
+        self.issued += 1
+        return number
+
+    @staticmethod
+    def negate(literal):
+        return -literal
+
+
+class ReductionStats:
+    def __init__(self):
+        self.clauses_in = 0
+        self.clauses_out = 0
+        self.literals_in = 0
+        self.literals_out = 0
+        self.variables_added = 0
+
+    def __str__(self):
+        return (f"clauses {self.clauses_in} -> {self.clauses_out}, "
+                f"literals {self.literals_in} -> {self.literals_out}, "
+                f"fresh variables {self.variables_added}")
+
+
+def to_3sat(cnf_clauses, fresh, stats=None, pad=True):
+    '''
+    precondition: cnf_clauses is an iterable of clauses (sequences of
+                  literals) and fresh never returns a variable of the input
+    postcondition: yields an equisatisfiable sequence of 3-literal clauses;
+                   with pad=False short clauses are passed through as they
+                   are, so the output is only at most 3 literals wide.
+                   stats, when given, is updated as clauses are consumed
+    '''
+    negate = fresh.negate
+    for clause in cnf_clauses:
+        clause = list(clause)
+        size = len(clause)
+        issued = fresh.issued
+        if size == 3 or (size < 3 and not pad):
+            out = [clause]
+        elif size > 3:
+            out = []
+            link = fresh.new()
+            out.append([clause[0], clause[1], link])
+            for literal in clause[2:-2]:
+                nxt = fresh.new()
+                out.append([negate(link), literal, nxt])
+                link = nxt
+            out.append([negate(link), clause[-2], clause[-1]])
+        elif size == 2:
+            y = fresh.new()
+            out = [clause + [y], clause + [negate(y)]]
+        elif size == 1:
+            y1, y2 = fresh.new(), fresh.new()
+            out = [clause + [a, b] for a in (y1, negate(y1)) for b in (y2, negate(y2))]
+        else:
+            y = [fresh.new() for _ in range(3)]
+            out = [[a, b, c] for a in (y[0], negate(y[0]))
+                   for b in (y[1], negate(y[1]))
+                   for c in (y[2], negate(y[2]))]
+        if stats is not None:
+            stats.clauses_in += 1
+            stats.literals_in += size
+            stats.clauses_out += len(out)
+            stats.literals_out += sum(len(c) for c in out)
+            stats.variables_added += fresh.issued - issued
+        yield from out
+
+
+def formula_to_3sat(expression: str, stats=None):
+    '''
+    Streams the 3-SAT form of an infix WFF: CNF conversion and splitting
+    both run clause by clause.
+    '''
+    tree = Parser(tokenize(expression)).parse_formula()
+    cnf = CNF(NNF(Parser(tokenize(IMPLICATION_FREE(expression))).parse_formula()))
+    fresh = FreshNames(taken=variables(tree))
+    return to_3sat(clauses(cnf), fresh, stats)
+
+
+def dimacs_to_3sat(input_path, output_path, stats=None):
+    from DIMACS import read_dimacs, DimacsWriter
+
+    instance = read_dimacs(input_path)
+    literals = instance.literals
+    # Trust the literals over the problem line when numbering fresh variables.
+    num_vars = max(instance.num_vars, max(literals, default=0), -min(literals, default=0))
+    with DimacsWriter(output_path) as writer:
+        for clause in to_3sat(instance.clauses(), FreshNumbers(num_vars), stats):
+            writer.add_clause(clause)
+
+
+def main():
+    '''
+    With two paths, reduces a DIMACS file to another; otherwise prints the
+    3-SAT form of CNF_Input.txt.
+    '''
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    stats = ReductionStats()
+    try:
+        if len(sys.argv) > 2:
+            dimacs_to_3sat(sys.argv[1], sys.argv[2], stats)
+            print(stats)
+            return
+        with open(os.path.join(current_dir, "CNF_Input.txt"), "r", encoding="utf-8") as f:
+            expression = f.readline().strip()
+            if not expression:
+                raise ValueError("Input file is empty.")
+        print(' ∧ '.join(f"({' ∨ '.join(clause)})" for clause in formula_to_3sat(expression, stats)))
+        print(stats)
+
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
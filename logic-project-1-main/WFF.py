@@ -1,5 +1,6 @@
 import os
 import sys
+from Budget import BudgetExceeded
 
 class Node:
     def __init__(self, value, left=None, right=None):
@@ -43,10 +44,47 @@ class Node:
         '''
         return True if (self.value == '¬' and not self.right) else False
 
+class SymbolTable:
+    '''
+    Interns variable names: every name gets a dense integer id, and one
+    canonical string object that all tokens of that name share.
+    '''
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def intern(self, name):
+        '''
+        Returns the dense id of name, adding it on first use.
+        '''
+        sid = self.ids.get(name)
+        if sid is None:
+            sid = len(self.names)
+            self.ids[name] = sid
+            self.names.append(name)
+        return sid
+
+    def canonical(self, name):
+        return self.names[self.intern(name)]
+
+    def name(self, sid):
+        return self.names[sid]
+
+symbols = SymbolTable()
+
+def is_identifier_part(c):
+    return c.islower() or c in '0123456789_'
+
 def tokenize(s: str, extra=''):
+    '''
+    Splits a formula into tokens. A variable is a lowercase letter followed
+    by lowercase letters, digits or underscores (p, x12, p_3); its token is
+    the canonical name from the global symbol table.
+    '''
     tokens = []
     i = 0
-    while i < len(s):
+    n = len(s)
+    while i < n:
         c = s[i]
         if c in '()':
             tokens.append(c)
@@ -54,7 +92,14 @@ def tokenize(s: str, extra=''):
             tokens.append(c)
         elif c == '→':
             tokens.append('→')
-        elif c.islower() or c in extra:
+        elif c.islower():
+            j = i + 1
+            while j < n and is_identifier_part(s[j]):
+                j += 1
+            tokens.append(symbols.canonical(s[i:j]))
+            i = j
+            continue
+        elif c in extra:
             tokens.append(c)
         elif c == ' ':
             pass
@@ -64,10 +109,12 @@ def tokenize(s: str, extra=''):
     return tokens
 
 class Parser:
-    def __init__(self, tokens, extra=''):
+    def __init__(self, tokens, extra='', node=Node, budget=None):
         self.tokens = tokens
         self.pos = 0
         self.extra = extra
+        self.node = node
+        self.budget = budget
 
     def current(self):
         return self.tokens[self.pos] if self.pos < len(self.tokens) else None
@@ -76,36 +123,87 @@ class Parser:
         self.pos += 1
 
     def parse_formula(self):
-        return self.parse_binary()
+        if self.budget is None:
+            return self.parse_binary()
+        try:
+            return self.parse_binary()
+        except BudgetExceeded as e:
+            e.stats.setdefault('tokens parsed', self.pos)
+            raise
+
+    def new_node(self, value, left=None, right=None):
+        if self.budget is not None:
+            self.budget.allocate()
+        return self.node(value, left, right)
 
     def parse_binary(self):
-        node = self.parse_unary()
-        while self.current() in ('∧', '∨', '→'):
-            op = self.current()
-            self.consume()
-            right = self.parse_unary()
-            node = Node(op, node, right)
-        return node
-
-    def parse_unary(self):
-        token = self.current()
-        if token == '¬':
-            self.consume()
-            operand = self.parse_unary()
-            return Node('¬', operand)
-        elif token == '(':
-            self.consume()
-            node = self.parse_formula()
-            if self.current() != ')':
-                raise ValueError("Missing closing parenthesis")
-            self.consume()
-            return node
-        elif token and (token.islower() or token in self.extra):
+        '''
+        Binary connectives group to the left and ¬ binds tightest. Nesting
+        lives on an explicit stack of enclosing parentheses, each frame
+        holding (negations, left, op) as they stood at its '(', so deeply
+        nested input cannot hit Python's recursion limit. depth counts the
+        open parentheses and negations around the current token; a budget
+        can bound it, since later passes over the tree still recurse.
+        '''
+        frames = []
+        depth = 0
+        negations, left, op = 0, None, None
+        while True:
+            if self.budget is not None:
+                self.budget.step()
+            token = self.current()
+            if token == '¬':
+                self.consume()
+                negations += 1
+                if self.budget is not None:
+                    self.budget.nest(depth + negations)
+                continue
+            if token == '(':
+                self.consume()
+                frames.append((negations, left, op))
+                depth += negations + 1
+                negations, left, op = 0, None, None
+                if self.budget is not None:
+                    self.budget.nest(depth)
+                continue
+            if not (token and (token.islower() or token in self.extra)):
+                raise ValueError("Unexpected token")
             self.consume()
-            return Node(token)
-        else:
-            raise ValueError("Unexpected token")
-
+            operand = self.new_node(token)
+            while True:
+                for _ in range(negations):
+                    operand = self.new_node('¬', operand)
+                left = operand if op is None else self.new_node(op, left, operand)
+                negations, op = 0, None
+                if self.current() in ('∧', '∨', '→'):
+                    op = self.current()
+                    self.consume()
+                    break
+                if not frames:
+                    return left
+                if self.current() != ')':
+                    raise ValueError("Missing closing parenthesis")
+                self.consume()
+                operand = left
+                negations, left, op = frames.pop()
+                depth -= negations + 1
+
+def variables(node):
+    '''
+    Returns the set of variable names occurring in the tree.
+    '''
+    names = set()
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.left is None and node.right is None:
+            if node.value not in '⊤⊥':
+                names.add(node.value)
+            continue
+        for child in (node.left, node.right):
+            if child is not None:
+                stack.append(child)
+    return names
 
 def print_tree(node, depth=0):
     if node is None:
@@ -0,0 +1,134 @@
+'''
+Checks for BDD reordering.
+
+A disjunction of n pairs (x0 ∧ y0) ∨ … built with every x above every y has
+2^(n+1) - 2 nodes; sifting must bring it down to the 2n nodes of the
+interleaved order within a time bound. Random formulas with several roots
+are sifted too; afterwards every root must keep its truth table, the unique
+table and the reference counts must match the live nodes, and building a
+root's formula again must give back the same node.
+
+Run from anywhere: python tests/check_bdd.py [pairs] [seconds]
+'''
+
+import os
+import random
+import sys
+import time
+from itertools import product
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from WFF import Parser, tokenize
+from BDD import BDD, TRUE
+
+NAMES = ['p', 'q', 'r', 's', 't', 'u', 'v']
+
+
+def parse(text):
+    return Parser(tokenize(text, extra='⊤⊥'), extra='⊤⊥').parse_formula()
+
+
+def random_formula(rng, depth):
+    if depth == 0 or rng.random() < 0.2:
+        return rng.choice(NAMES + ['⊤', '⊥'])
+    if rng.random() < 0.2:
+        return f"¬{random_formula(rng, depth - 1)}"
+    return f"({random_formula(rng, depth - 1)} {rng.choice('∧∨→')} {random_formula(rng, depth - 1)})"
+
+
+def evaluate(bdd, node, assignment):
+    while node > TRUE:
+        node = bdd.high[node] if assignment[bdd.var[node]] else bdd.low[node]
+    return node == TRUE
+
+
+def consistency(bdd, roots):
+    '''
+    Returns a description of the first broken invariant, or None.
+    '''
+    live = [node for node in range(2, len(bdd.var)) if bdd.var[node] is not None]
+    refs = {node: 0 for node in live}
+    for node in live:
+        if bdd.unique.get((bdd.var[node], bdd.low[node], bdd.high[node])) != node:
+            return f"node {node} is missing from the unique table"
+        if node not in bdd.nodes_of[bdd.var[node]]:
+            return f"node {node} is missing from its level"
+        for child in (bdd.low[node], bdd.high[node]):
+            if child > TRUE:
+                if bdd.var[child] is None:
+                    return f"node {node} points at freed node {child}"
+                if bdd.level(child) <= bdd.level(node):
+                    return f"node {node} points up to node {child}"
+                refs[child] += 1
+    if len(bdd.unique) != len(live):
+        return "the unique table holds freed nodes"
+    for node in live:
+        if bdd.refs[node] != refs[node]:
+            return f"node {node} counts {bdd.refs[node]} references, has {refs[node]}"
+    if len(live) != bdd.size(roots):
+        return f"{len(live) - bdd.size(roots)} unreachable nodes survived"
+    return None
+
+
+def check_bad_order(pairs, seconds):
+    text = ' ∨ '.join(f"(x{i} ∧ y{i})" for i in range(pairs))
+    bdd = BDD(order=[f"x{i}" for i in range(pairs)] + [f"y{i}" for i in range(pairs)])
+    root = bdd.from_formula(parse(text))
+    models = bdd.count(root)
+    before = bdd.size([root])
+    start = time.perf_counter()
+    after = bdd.sift([root])
+    elapsed = time.perf_counter() - start
+    print(f"{pairs} pairs: {before} -> {after} nodes in {elapsed:.2f} s")
+    failures = []
+    if after != 2 * pairs or bdd.size([root]) != after:
+        failures.append(f"sifting left {bdd.size([root])} nodes, expected {2 * pairs}")
+    if elapsed > seconds:
+        failures.append(f"sifting took {elapsed:.2f} s, more than {seconds} s")
+    if bdd.count(root) != models or bdd.from_formula(parse(text)) != root:
+        failures.append("sifting changed the function")
+    if len(bdd.var) > 2 * (before + 2):
+        failures.append(f"the node arrays grew to {len(bdd.var)} entries")
+    return failures
+
+
+def check_random(trials):
+    rng = random.Random(7)
+    assignments = [dict(zip(NAMES, bits)) for bits in product((False, True), repeat=len(NAMES))]
+    failures = []
+    for trial in range(trials):
+        order = NAMES[:]
+        rng.shuffle(order)
+        bdd = BDD(order=order, cache_size=64)
+        texts = [random_formula(rng, 5) for _ in range(3)]
+        roots = [bdd.from_formula(parse(text)) for text in texts]
+        tables = [[evaluate(bdd, root, a) for a in assignments] for root in roots]
+        size = bdd.sift(roots)
+        problem = consistency(bdd, roots)
+        if problem is None and size != bdd.size(roots):
+            problem = f"sift returned {size}, the roots have {bdd.size(roots)} nodes"
+        if problem is None:
+            for text, root, table in zip(texts, roots, tables):
+                if [evaluate(bdd, root, a) for a in assignments] != table:
+                    problem = f"{text} changed its truth table"
+                elif bdd.from_formula(parse(text)) != root:
+                    problem = f"{text} is no longer canonical"
+        if problem is not None:
+            failures.append(f"trial {trial}: {problem}")
+    return failures
+
+
+def main():
+    pairs = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    failures = check_bad_order(pairs, seconds) + check_random(300)
+    for failure in failures[:10]:
+        print(failure)
+    print("ok" if not failures else f"{len(failures)} failures")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
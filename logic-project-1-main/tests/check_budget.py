@@ -0,0 +1,122 @@
+'''
+Checks that every engine taking a budget stops on it cleanly.
+
+Formulas nested or chained thousands of levels deep go through the CNF
+conversion under a deadline and must either convert, to the same text as
+without a budget, or raise BudgetExceeded, never RecursionError. The SAT
+search, the Horn solver behind SAT.solve and BDD.ite must each hit a small
+budget, and a malformed $LOGIC_BUDGET must be reported as an error by the
+command-line tools.
+
+Run from anywhere: python tests/check_budget.py
+'''
+
+import os
+import subprocess
+import sys
+
+current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, current_dir)
+
+from Budget import Budget, BudgetExceeded
+from BDD import BDD
+from CNF import cnf_text
+from SAT import search, solve
+from WFF import Parser, tokenize
+
+DEEP = {
+    'nested': '(' * 3000 + 'p' + ' ∧ q)' * 3000,
+    'negated': '¬(' * 3000 + 'p ∨ q' + ')' * 3000,
+    'chained': ' ∨ '.join(f"x{i}" for i in range(3000)),
+    'distributed': ' ∨ '.join(f"(a{i} ∧ b{i})" for i in range(40)),
+}
+
+
+def pigeonhole(holes):
+    '''
+    Clauses saying holes + 1 pigeons sit in holes holes, one per hole:
+    unsatisfiable, and not renamable Horn.
+    '''
+    def var(pigeon, hole):
+        return pigeon * holes + hole + 1
+
+    clauses = [[var(p, h) for h in range(holes)] for p in range(holes + 1)]
+    for h in range(holes):
+        for p in range(holes + 1):
+            for q in range(p):
+                clauses.append([-var(p, h), -var(q, h)])
+    return clauses
+
+
+def expect_exceeded(label, reason, run):
+    try:
+        run()
+    except BudgetExceeded as e:
+        if e.reason != reason:
+            return f"{label}: stopped on {e.reason}, expected {reason}"
+        return None
+    except RecursionError:
+        return f"{label}: RecursionError"
+    return f"{label}: finished within the budget"
+
+
+def check_deep():
+    failures = []
+    for name in ('nested', 'negated', 'chained'):
+        expression = DEEP[name]
+        try:
+            text = cnf_text(expression, Budget(seconds=0.5))
+        except BudgetExceeded:
+            continue
+        except RecursionError:
+            failures.append(f"{name}: RecursionError")
+            continue
+        if text != cnf_text(expression):
+            failures.append(f"{name}: the budget changed the CNF")
+    # 2^40 clauses: only the deadline can stop it.
+    failures.append(expect_exceeded('distributed', 'deadline', lambda: cnf_text(DEEP['distributed'], Budget(seconds=0.5))))
+    return failures
+
+
+def check_engines():
+    failures = []
+    budget = Budget(max_steps=50)
+    failures.append(expect_exceeded('search', 'steps', lambda: search(pigeonhole(5), budget)))
+    if budget.progress.get('search nodes', 0) == 0:
+        failures.append("search: no progress recorded")
+    # A long Horn chain only reaches horn_model through solve's budget.
+    chain = [[1]] + [[-i, i + 1] for i in range(1, 2000)]
+    failures.append(expect_exceeded('horn', 'nodes', lambda: solve(chain, Budget(max_nodes=100))))
+    failures.append(expect_exceeded('search through solve', 'steps', lambda: solve(pigeonhole(5), Budget(max_steps=50))))
+    if solve(pigeonhole(3), Budget(max_steps=10 ** 6))[:2] != (False, None):
+        failures.append("pigeonhole(3): wrong answer under a budget")
+
+    tree = Parser(tokenize(' ∨ '.join(f"(x{i} ∧ y{i})" for i in range(12)))).parse_formula()
+    bdd = BDD(order=[f"x{i}" for i in range(12)] + [f"y{i}" for i in range(12)], budget=Budget(max_steps=100))
+    failures.append(expect_exceeded('ite', 'steps', lambda: bdd.from_formula(tree)))
+    return failures
+
+
+def check_cli():
+    failures = []
+    environment = dict(os.environ, LOGIC_BUDGET='bogus=3')
+    environment.pop('LOGIC_CACHE', None)
+    for script, args in (('ND2.py', ['ND2.txt']), ('CNF.py', []), ('Horn.py', []), ('SAT.py', []), ('BDD.py', [])):
+        result = subprocess.run([sys.executable, script] + args, cwd=current_dir, env=environment,
+                                capture_output=True, text=True, encoding='utf-8')
+        if result.stdout.strip() != "Error: Unknown budget limit: bogus" or result.returncode != 0:
+            failures.append(f"{script}: {(result.stdout + result.stderr).strip()[-200:]!r}")
+    return failures
+
+
+def main():
+    failures = [f for f in check_deep() + check_engines() + check_cli() if f is not None]
+    for failure in failures:
+        print(failure)
+    print("ok" if not failures else f"{len(failures)} failures")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
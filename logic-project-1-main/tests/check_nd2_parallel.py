@@ -0,0 +1,93 @@
+'''
+Parity check between ND2's sequential and parallel validators.
+
+Every test5x fixture and every proof of phase5_more_test.txt, together with
+random one-line mutations of each, is validated sequentially and on a
+process pool with small chunks, through run_validator as the CLI does. Both
+modes must report the same verdict, and on a fixture the parallel verdict
+must also be the one the sequential mode gives.
+
+Run from anywhere: python tests/check_nd2_parallel.py [mutations per proof]
+'''
+
+import glob
+import os
+import random
+import re
+import sys
+import tempfile
+
+current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, current_dir)
+
+import ND2
+
+
+def fixtures():
+    for path in sorted(glob.glob(os.path.join(current_dir, 'tests', 'test5*.txt'))):
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+        yield os.path.basename(path), text.split('input:\n', 1)[1].split('\noutput:\n')[0]
+    with open(os.path.join(current_dir, 'phase5_more_test.txt'), encoding='utf-8') as f:
+        blocks = re.split(r'-{10,}.*\n', f.read())
+    for number, block in enumerate(blocks):
+        if block.strip():
+            yield f"phase5 proof {number}", block.strip('\n')
+
+
+def mutate(rng, proof):
+    lines = proof.split('\n')
+    i = rng.randrange(len(lines))
+    choice = rng.random()
+    if choice < 0.3:
+        lines[i] = lines[i].replace('p', 'q', 1)
+    elif choice < 0.6:
+        lines[i] = lines[i].replace('∧', '∨', 1)
+    elif choice < 0.8:
+        lines[i] = lines[i].replace('(', '', 1).replace(')', '', 1)
+    else:
+        lines[i] = lines[i].replace('¬', '¬¬', 1)
+    return '\n'.join(lines)
+
+
+def verdicts(proof):
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False, encoding='utf-8') as f:
+        f.write(proof)
+    try:
+        ND2.parse_proof_file(f.name)
+    except ValueError:
+        os.remove(f.name)
+        return None
+    try:
+        # chunk_size 3 cuts every proof into several chunks.
+        sequential = ND2.run_validator(f.name)
+        parallel = ND2.validate_proof_parallel(ND2.parse_proof_file(f.name), 2, chunk_size=3)
+        cli = ND2.run_validator(f.name, workers=2)
+    finally:
+        os.remove(f.name)
+    return sequential, parallel, cli
+
+
+def main():
+    mutations = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    rng = random.Random(2)
+    checked = 0
+    failures = []
+    for name, proof in fixtures():
+        cases = [(name, proof)] + [(f"{name}, mutation {k}", mutate(rng, proof)) for k in range(mutations)]
+        for label, text in cases:
+            result = verdicts(text)
+            if result is None:
+                continue
+            checked += 1
+            if len(set(result)) != 1:
+                failures.append(f"{label}: sequential {result[0]!r}, parallel {result[1]!r}, workers=2 {result[2]!r}")
+    for failure in failures:
+        print(failure)
+    print(f"{checked - len(failures)} of {checked} proofs agree")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
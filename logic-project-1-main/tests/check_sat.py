@@ -0,0 +1,167 @@
+'''
+Checks for SAT: the routing to the horn, renamable-horn and search engines,
+the Horn renaming, the 2-SAT solver and the models returned.
+
+Fixed cases pin down the engine each kind of clause set goes to. Random
+clause sets over a few variables are then compared with brute force:
+satisfiability, every returned model, whether a Horn renaming exists, and
+2-SAT answers.
+
+Run from anywhere: python tests/check_sat.py [trials]
+'''
+
+import os
+import random
+import sys
+from itertools import product
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SAT import is_horn, horn_renaming, solve, solve_2sat, solve_formula
+
+# (clauses, satisfiable, engine)
+CASES = [
+    ([], True, 'horn'),
+    ([[]], False, 'horn'),
+    ([[1, 2], []], False, 'renamable-horn'),
+    ([[1], [2], [-1, -2, 3]], True, 'horn'),
+    ([[1], [-1, 2], [-2]], False, 'horn'),
+    ([[1], [-1]], False, 'horn'),
+    ([[1, -1], [2]], True, 'horn'),
+    ([[1, 2], [1, -2]], True, 'renamable-horn'),
+    ([[1, 2, 3], [-1, 4], [-4]], True, 'renamable-horn'),
+    ([[1, 2], [-1], [-2]], False, 'renamable-horn'),
+    ([[1, 2], [-1, 2], [1, -2], [-1, -2]], False, 'search'),
+    ([[1, 2, 3], [-1, -2, -3]], True, 'search'),
+    ([[1, 2, 3], [-1, -2], [-2, -3], [-1, -3], [1, 2], [2, 3], [1, 3]], False, 'search'),
+]
+
+# (formula, satisfiable, engine)
+FORMULAS = [
+    ("(x1 ∨ x12) ∧ ¬x1", True, 'renamable-horn'),
+    ("(p ∨ q) ∧ (¬p ∨ q) ∧ (p ∨ ¬q) ∧ (¬p ∨ ¬q)", False, 'search'),
+    ("(p → q) ∧ p ∧ ¬q", False, 'horn'),
+]
+
+
+def satisfies(model, clauses):
+    return all(any(model[abs(literal)] == (literal > 0) for literal in clause) for clause in clauses)
+
+
+def brute_force(clauses):
+    variables = sorted({abs(literal) for clause in clauses for literal in clause})
+    return any(
+        satisfies(dict(zip(variables, values)), clauses)
+        for values in product((False, True), repeat=len(variables))
+    )
+
+
+def renamable(clauses):
+    variables = sorted({abs(literal) for clause in clauses for literal in clause})
+    for flips in product((False, True), repeat=len(variables)):
+        flipped = {var for var, flip in zip(variables, flips) if flip}
+        if is_horn([[-l if abs(l) in flipped else l for l in clause] for clause in clauses]):
+            return True
+    return False
+
+
+def check_solution(clauses, answer, model):
+    '''
+    Returns a description of what is wrong with solve's answer, or None.
+    '''
+    if answer != brute_force(clauses):
+        return f"answered {answer}"
+    if answer:
+        variables = {abs(literal) for clause in clauses for literal in clause}
+        if set(model) != variables:
+            return f"model covers {sorted(model)}"
+        if not satisfies(model, clauses):
+            return f"model {model} fails"
+    return None
+
+
+def random_clauses(rng):
+    num_vars = rng.randint(1, 6)
+    if rng.random() < 0.25:
+        # Random 3-CNF near the threshold, which is rarely renamable.
+        return [
+            [rng.choice((-1, 1)) * rng.randint(1, num_vars) for _ in range(3)]
+            for _ in range(rng.randint(num_vars, 5 * num_vars))
+        ]
+    clauses = [
+        [rng.choice((-1, 1)) * rng.randint(1, num_vars) for _ in range(rng.randint(0, 4))]
+        for _ in range(rng.randint(0, 9))
+    ]
+    if rng.random() < 0.5:
+        # Make it Horn, then hide that behind a random renaming.
+        for clause in clauses:
+            positives = [i for i, literal in enumerate(clause) if literal > 0]
+            for i in positives[1:]:
+                clause[i] = -clause[i]
+        flips = {var for var in range(1, num_vars + 1) if rng.random() < 0.5}
+        clauses = [[-l if abs(l) in flips else l for l in clause] for clause in clauses]
+    return clauses
+
+
+def check_random(trials):
+    rng = random.Random(1)
+    failures = []
+    engines = {}
+    for _ in range(trials):
+        clauses = random_clauses(rng)
+        answer, model, engine = solve(clauses)
+        engines[engine] = engines.get(engine, 0) + 1
+        problem = check_solution(clauses, answer, model)
+        flips = horn_renaming(clauses)
+        if flips is None and renamable(clauses):
+            problem = "horn_renaming missed a renaming"
+        elif flips is not None and not is_horn([[-l if abs(l) in flips else l for l in c] for c in clauses]):
+            problem = f"renaming {flips} is not Horn"
+        if problem is not None:
+            failures.append(f"{clauses} ({engine}): {problem}")
+
+        # 2-SAT over variables 0 .. n - 1: clause (a, b) means ¬a ∨ b.
+        num_vars = rng.randint(1, 5)
+        pairs = [(rng.randrange(2 * num_vars), rng.randrange(2 * num_vars)) for _ in range(rng.randint(0, 8))]
+        values = solve_2sat(num_vars, pairs)
+
+        def holds(values, literal):
+            return values[literal // 2] != (literal % 2 == 1)
+
+        expected = any(
+            all(not holds(v, a) or holds(v, b) for a, b in pairs)
+            for v in product((False, True), repeat=num_vars)
+        )
+        if (values is not None) != expected:
+            failures.append(f"2-SAT {pairs} over {num_vars}: answered {values is not None}")
+        elif values is not None and not all(not holds(values, a) or holds(values, b) for a, b in pairs):
+            failures.append(f"2-SAT {pairs} over {num_vars}: {values} fails")
+    return failures, engines
+
+
+def main():
+    trials = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    failures = []
+    for clauses, satisfiable, engine in CASES:
+        answer, model, got = solve(clauses)
+        if (answer, got) != (satisfiable, engine):
+            failures.append(f"{clauses}: {answer} by {got}, expected {satisfiable} by {engine}")
+        problem = check_solution(clauses, answer, model)
+        if problem is not None:
+            failures.append(f"{clauses}: {problem}")
+    for formula, satisfiable, engine in FORMULAS:
+        answer, model, got = solve_formula(formula)
+        if (answer, got) != (satisfiable, engine):
+            failures.append(f"{formula}: {answer} by {got}, expected {satisfiable} by {engine}")
+    random_failures, engines = check_random(trials)
+    failures += random_failures
+    for failure in failures[:10]:
+        print(failure)
+    print(', '.join(f"{engine} {count}" for engine, count in sorted(engines.items())))
+    print("ok" if not failures else f"{len(failures)} failures")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
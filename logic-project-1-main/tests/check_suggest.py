@@ -0,0 +1,118 @@
+'''
+Brute-force parity check for Suggest.RuleIndex.
+
+For random proof states, the suggestions of the index must be exactly the
+one- and two-premise instances that Natural_Deduction.apply_rule accepts,
+and adding the lines one by one must yield the same set. Formulas are
+written with and without parentheses the parser does not need, so the
+parser's left-to-right reading and convert_to_postfix's precedences disagree
+on some of them.
+
+Run from anywhere: python tests/check_suggest.py [trials]
+'''
+
+import os
+import random
+import sys
+from itertools import product
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Natural_Deduction
+from Suggest import RuleIndex
+
+ATOMS = ['p', 'q', 'r', 'x12', '⊤', '⊥']
+
+
+def random_tree(rng, depth):
+    if depth == 0 or rng.random() < 0.3:
+        return rng.choice(ATOMS)
+    if rng.random() < 0.25:
+        return ('¬', random_tree(rng, depth - 1))
+    return (rng.choice('∧∨→'), random_tree(rng, depth - 1), random_tree(rng, depth - 1))
+
+
+def render(rng, tree, outer=True):
+    '''
+    Writes tree so that WFF.Parser reads it back as tree. A binary left
+    operand sometimes loses its parentheses, which the parser, reading left
+    to right, does not need but convert_to_postfix does.
+    '''
+    if isinstance(tree, str):
+        return tree
+    if tree[0] == '¬':
+        inner = render(rng, tree[1])
+        return f"¬({inner})" if rng.random() < 0.3 else f"¬{inner}"
+    left = render(rng, tree[1], outer=False)
+    if not isinstance(tree[1], str) and tree[1][0] != '¬' and rng.random() < 0.5:
+        left = left[1:-1]
+    text = f"{left} {tree[0]} {render(rng, tree[2])}"
+    return text if outer and rng.random() < 0.5 else f"({text})"
+
+
+def related_formula(rng, trees, pool):
+    '''
+    Returns a tree likely to combine with the lines already present.
+    '''
+    choice = rng.random()
+    if choice < 0.4 and trees:
+        return ('¬', rng.choice(trees))
+    if choice < 0.55 and trees:
+        return ('→', rng.choice(trees), rng.choice(pool))
+    return rng.choice(pool)
+
+
+def expected(formulas):
+    found = set()
+    for rule in Natural_Deduction.rule_functions:
+        for count in (1, 2):
+            for lines in product(formulas, repeat=count):
+                if count == 2 and lines[0] == lines[1]:
+                    continue
+                output = Natural_Deduction.apply_rule(formulas, rule, list(lines))
+                if output is not None:
+                    found.add((rule, lines, output))
+    return found
+
+
+def check(formulas):
+    '''
+    Returns a description of the first disagreement, or None.
+    '''
+    index = RuleIndex()
+    added = set()
+    for number, formula in formulas.items():
+        added.update((rule, tuple(lines), output) for rule, lines, output in index.add_line(number, formula))
+    suggested = {(rule, tuple(lines), output) for rule, lines, output in index.suggestions()}
+    wanted = expected(formulas)
+    if suggested != wanted:
+        return f"{formulas}: extra {suggested - wanted}, missing {wanted - suggested}"
+    if added != suggested:
+        return f"{formulas}: incremental {added ^ suggested}"
+    return None
+
+
+def main():
+    trials = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    rng = random.Random(5)
+    failures = []
+    cases = [{1: '(p ∨ q) ∧ r', 2: '¬(p ∨ q ∧ r)'}, {1: 'p ∨ q ∧ r', 2: '¬(p ∨ q ∧ r)'}]
+    for _ in range(trials):
+        pool = [random_tree(rng, 3) for _ in range(4)]
+        trees = []
+        for _ in range(rng.randint(1, 7)):
+            trees.append(related_formula(rng, trees, pool))
+        cases.append({number: render(rng, tree) for number, tree in enumerate(trees, 1)})
+    for formulas in cases:
+        failure = check(formulas)
+        if failure is not None:
+            failures.append(failure)
+    for failure in failures[:10]:
+        print(failure)
+    print(f"{len(cases) - len(failures)} of {len(cases)} states agree")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()